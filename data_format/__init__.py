@@ -6,10 +6,12 @@ from .constants import (
     RESULT_FILENAME,
     SCREENSHOT_FILENAME,
     STEPS_DIRNAME,
+    STEPS_PARQUET_FILENAME,
     TASK_FILENAME,
     UI_TREE_FILENAME,
 )
-from .io import load_dataset_index, load_task, load_trajectory, save_trajectory
+from .batch import StepsBatch
+from .io import load_dataset_index, load_task, load_trajectory, save_trajectory, save_trajectory_parquet
 from .models import Action, DatasetIndex, DatasetIndexEntry, Result, Step, Task, Trajectory
 from . import paths
 from .sft import iter_sft_samples
@@ -23,6 +25,7 @@ __all__ = [
     "RESULT_FILENAME",
     "SCREENSHOT_FILENAME",
     "STEPS_DIRNAME",
+    "STEPS_PARQUET_FILENAME",
     "TASK_FILENAME",
     "UI_TREE_FILENAME",
     "Action",
@@ -30,6 +33,7 @@ __all__ = [
     "DatasetIndexEntry",
     "Result",
     "Step",
+    "StepsBatch",
     "Task",
     "Trajectory",
     "ValidationIssue",
@@ -39,6 +43,7 @@ __all__ = [
     "load_trajectory",
     "paths",
     "save_trajectory",
+    "save_trajectory_parquet",
     "validate_dataset_dir",
     "validate_trajectory_dir",
 ]
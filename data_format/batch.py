@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, List, Sequence
+
+from .models import _SLOTS, Action, Step
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+
+def _steps_schema() -> "pa.Schema":
+    import pyarrow as pa
+
+    return pa.schema(
+        [
+            ("index", pa.int64()),
+            ("action_type", pa.string()),
+            ("action_json", pa.string()),
+            ("ui_tree_json", pa.string()),
+            ("screenshot_path", pa.string()),
+        ]
+    )
+
+
+@dataclass(frozen=True, **_SLOTS)
+class StepsBatch:
+    """Steps as parallel pyarrow arrays (one per column) instead of Step objects.
+
+    Row i of every array is the same step. ui_tree and action stay JSON text,
+    so filtering on index or action_type never decodes them. The columns
+    match steps.parquet. Requires pyarrow.
+    """
+
+    index: "pa.Int64Array"
+    action_type: "pa.StringArray"
+    action_json: "pa.StringArray"
+    ui_tree_json: "pa.StringArray"
+    screenshot_path: "pa.StringArray"
+
+    @classmethod
+    def from_steps(cls, steps: Sequence[Step]) -> "StepsBatch":
+        import pyarrow as pa
+
+        schema = _steps_schema()
+        columns = (
+            [step.index for step in steps],
+            [step.action.action_type for step in steps],
+            [json.dumps(step.action.to_dict(), ensure_ascii=True) for step in steps],
+            [json.dumps(step.ui_tree, ensure_ascii=True) for step in steps],
+            [step.screenshot_path for step in steps],
+        )
+        return cls(*(pa.array(values, type=f.type) for values, f in zip(columns, schema)))
+
+    @classmethod
+    def from_table(cls, table: "pa.Table") -> "StepsBatch":
+        # Chunked columns (e.g. from a multi-row-group file) become one array each
+        return cls(*(table.column(name).combine_chunks() for name in _steps_schema().names))
+
+    def to_table(self) -> "pa.Table":
+        import pyarrow as pa
+
+        schema = _steps_schema()
+        return pa.Table.from_arrays([getattr(self, name) for name in schema.names], schema=schema)
+
+    def to_steps(self) -> List[Step]:
+        # Convert column by column; Table.to_pylist would build a dict per row
+        return [
+            Step(
+                index=index,
+                ui_tree=json.loads(ui_tree_json),
+                action=Action.from_dict(json.loads(action_json)),
+                screenshot_path=screenshot_path,
+            )
+            for index, action_json, ui_tree_json, screenshot_path in zip(
+                self.index.to_pylist(),
+                self.action_json.to_pylist(),
+                self.ui_tree_json.to_pylist(),
+                self.screenshot_path.to_pylist(),
+            )
+        ]
+
+    def __len__(self) -> int:
+        return len(self.index)
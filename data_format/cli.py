@@ -1,15 +1,26 @@
 from __future__ import annotations
 
 import argparse
+import sys
 from pathlib import Path
 from typing import Iterable, List, Optional
 
 from .validation import ValidationIssue, validate_dataset_dir, validate_trajectory_dir
 
 
+_WRITE_BATCH = 8192
+
+
 def _print_issues(issues: Iterable[ValidationIssue]) -> None:
+    # Large datasets can yield many thousands of issues; write them in
+    # batches rather than one print() call per line
+    lines: List[str] = []
     for issue in issues:
-        print(f"{issue.severity}: {issue.path}: {issue.message}")
+        lines.append(f"{issue.severity}: {issue.path}: {issue.message}\n")
+        if len(lines) >= _WRITE_BATCH:
+            sys.stdout.write("".join(lines))
+            lines.clear()
+    sys.stdout.write("".join(lines))
 
 
 def _exit_code(issues: List[ValidationIssue]) -> int:
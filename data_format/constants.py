@@ -4,6 +4,7 @@ METADATA_FILENAME = "metadata.json"
 RESULT_FILENAME = "result.json"
 SCREENSHOT_FILENAME = "screenshot.png"
 STEPS_DIRNAME = "steps"
+STEPS_PARQUET_FILENAME = "steps.parquet"
 TASK_FILENAME = "task.json"
 UI_TREE_FILENAME = "ui_tree.json"
 
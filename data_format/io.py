@@ -4,17 +4,33 @@ import json
 from pathlib import Path
 from typing import Any, Dict, List
 
+try:
+    import orjson
+except ImportError:  # optional; stdlib json is the fallback
+    orjson = None
+
+from .batch import StepsBatch
 from .models import Action, DatasetIndex, Result, Step, Task, Trajectory
 from . import paths
 
 
 def _load_json(path: Path) -> Dict[str, Any]:
+    if orjson is not None:
+        return orjson.loads(path.read_bytes())
     with path.open("r", encoding="utf-8") as handle:
         return json.load(handle)
 
 
 def _dump_json(path: Path, payload: Dict[str, Any]) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
+    if orjson is not None:
+        # Free-form payloads may hold int keys or ints beyond 64 bits; orjson
+        # rejects the latter, so those go through the stdlib path below
+        try:
+            path.write_bytes(orjson.dumps(payload, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+            return
+        except TypeError:
+            pass
     with path.open("w", encoding="utf-8") as handle:
         json.dump(payload, handle, ensure_ascii=True, indent=2)
 
@@ -54,10 +70,20 @@ def _list_step_dirs(traj_steps_dir: Path) -> List[Path]:
     return [entry for _, entry in sorted(numeric_dirs, key=lambda item: item[0])]
 
 
+def _load_steps_parquet(path: Path) -> List[Step]:
+    import pyarrow.parquet as pq
+
+    return StepsBatch.from_table(pq.read_table(path)).to_steps()
+
+
 def load_trajectory(trajectory_dir: Path) -> Trajectory:
     task = load_task(paths.task_path(trajectory_dir))
-    traj_steps_dir = paths.steps_dir(trajectory_dir)
-    steps = [load_step(step_dir) for step_dir in _list_step_dirs(traj_steps_dir)]
+    steps_parquet = paths.steps_parquet_path(trajectory_dir)
+    if steps_parquet.exists():
+        steps = _load_steps_parquet(steps_parquet)
+    else:
+        traj_steps_dir = paths.steps_dir(trajectory_dir)
+        steps = [load_step(step_dir) for step_dir in _list_step_dirs(traj_steps_dir)]
     result_file = paths.result_path(trajectory_dir)
     result = load_result(result_file) if result_file.exists() else None
     final_screenshot = paths.final_screenshot_path(trajectory_dir)
@@ -85,5 +111,22 @@ def save_trajectory(trajectory: Trajectory, trajectory_dir: Path) -> None:
         _dump_json(paths.result_path(trajectory_dir), trajectory.result.to_dict())
 
 
+def save_trajectory_parquet(trajectory: Trajectory, trajectory_dir: Path) -> None:
+    """Save a trajectory with all steps in one steps.parquet instead of steps/.
+
+    task.json and result.json are written as usual. Screenshots are not
+    copied; each row keeps the step's screenshot_path as given.
+    """
+    import pyarrow.parquet as pq
+
+    _dump_json(paths.task_path(trajectory_dir), trajectory.task.to_dict())
+    # ui_tree and action are free-form nested dicts; StepsBatch stores them as
+    # JSON text columns and keeps action_type alongside for column-only scans
+    table = StepsBatch.from_steps(trajectory.steps).to_table()
+    pq.write_table(table, paths.steps_parquet_path(trajectory_dir), compression="zstd")
+    if trajectory.result is not None:
+        _dump_json(paths.result_path(trajectory_dir), trajectory.result.to_dict())
+
+
 def load_dataset_index(index_path: Path) -> DatasetIndex:
     return DatasetIndex.from_dict(_load_json(index_path))
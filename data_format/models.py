@@ -1,14 +1,18 @@
 from __future__ import annotations
 
+import sys
 from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional
 
+# __slots__ instead of a per-instance __dict__ where supported (3.10+)
+_SLOTS: Dict[str, bool] = {"slots": True} if sys.version_info >= (3, 10) else {}
+
 
 def _split_extra(data: Dict[str, Any], known_fields: List[str]) -> Dict[str, Any]:
     return {key: value for key, value in data.items() if key not in known_fields}
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, **_SLOTS)
 class Task:
     task_id: str
     instruction: str
@@ -61,7 +65,7 @@ class Task:
         return data
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, **_SLOTS)
 class Action:
     step_index: int
     action_type: str
@@ -97,7 +101,7 @@ class Action:
         return data
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, **_SLOTS)
 class Step:
     index: int
     ui_tree: Dict[str, Any]
@@ -105,7 +109,7 @@ class Step:
     screenshot_path: Optional[str] = None
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, **_SLOTS)
 class Result:
     trajectory_id: str
     success: bool
@@ -157,7 +161,7 @@ class Result:
         return data
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, **_SLOTS)
 class Trajectory:
     trajectory_id: str
     task: Task
@@ -167,7 +171,7 @@ class Trajectory:
     root_dir: Optional[str] = None
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, **_SLOTS)
 class DatasetIndexEntry:
     id: str
     task_id: str
@@ -206,7 +210,7 @@ class DatasetIndexEntry:
         return data
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, **_SLOTS)
 class DatasetIndex:
     version: str
     trajectories: List[DatasetIndexEntry]
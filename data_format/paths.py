@@ -15,6 +15,7 @@ from .constants import (
     RESULT_FILENAME,
     SCREENSHOT_FILENAME,
     STEPS_DIRNAME,
+    STEPS_PARQUET_FILENAME,
     TASK_FILENAME,
     UI_TREE_FILENAME,
 )
@@ -50,6 +51,11 @@ def steps_dir(trajectory_dir: Path) -> Path:
     return trajectory_dir / STEPS_DIRNAME
 
 
+def steps_parquet_path(trajectory_dir: Path) -> Path:
+    """Return the steps.parquet path within a trajectory (columnar alternative to steps/)."""
+    return trajectory_dir / STEPS_PARQUET_FILENAME
+
+
 def result_path(trajectory_dir: Path) -> Path:
     """Return the result.json path within a trajectory."""
     return trajectory_dir / RESULT_FILENAME
@@ -1,23 +1,20 @@
 from __future__ import annotations
 
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable
 
-from .models import Action, Trajectory
-
-
-def _action_history(actions: List[Action]) -> List[Dict[str, object]]:
-    return [action.to_dict() for action in actions]
+from .models import Trajectory
 
 
 def iter_sft_samples(trajectory: Trajectory) -> Iterable[Dict[str, object]]:
-    history: List[Action] = []
-    for step in trajectory.steps:
+    # Serialize each action once; a step's history is a slice of the prefix
+    action_dicts = [step.action.to_dict() for step in trajectory.steps]
+    for i, step in enumerate(trajectory.steps):
         sample = {
             "input": {
                 "instruction": trajectory.task.instruction,
                 "screenshot": step.screenshot_path,
                 "ui_tree": step.ui_tree,
-                "history": _action_history(history),
+                "history": action_dicts[:i],
             },
             "output": {
                 "action": step.action.to_dict(),
@@ -25,4 +22,3 @@ def iter_sft_samples(trajectory: Trajectory) -> Iterable[Dict[str, object]]:
             },
         }
         yield sample
-        history.append(step.action)
@@ -1,10 +1,25 @@
 from __future__ import annotations
 
+import os
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List
+from typing import List, Set
 
 from . import paths
+from .constants import (
+    ACTION_FILENAME,
+    FINAL_SCREENSHOT_FILENAME,
+    RESULT_FILENAME,
+    SCREENSHOT_FILENAME,
+    STEPS_DIRNAME,
+    STEPS_PARQUET_FILENAME,
+    TASK_FILENAME,
+    UI_TREE_FILENAME,
+)
+
+
+_VALIDATION_WORKERS = 8
 
 
 @dataclass(frozen=True)
@@ -18,22 +33,19 @@ def _issue(path: Path, message: str, severity: str) -> ValidationIssue:
     return ValidationIssue(path=str(path), message=message, severity=severity)
 
 
-def validate_trajectory_dir(
-    trajectory_dir: Path,
-    require_final_screenshot: bool = False,
-    require_result: bool = False,
-) -> List[ValidationIssue]:
-    issues: List[ValidationIssue] = []
-    task_file = paths.task_path(trajectory_dir)
-    if not task_file.exists():
-        issues.append(_issue(task_file, "Missing task.json", "error"))
+def _entry_names(directory: Path) -> Set[str]:
+    # One directory read answers every "does X exist here" check for it
+    try:
+        with os.scandir(directory) as it:
+            return {entry.name for entry in it}
+    except (FileNotFoundError, NotADirectoryError):
+        return set()
 
-    traj_steps_dir = paths.steps_dir(trajectory_dir)
-    if not traj_steps_dir.exists():
-        issues.append(_issue(traj_steps_dir, "Missing steps directory", "error"))
-        return issues
 
-    step_dirs = [entry for entry in traj_steps_dir.iterdir() if entry.is_dir()]
+def _validate_step_dirs(traj_steps_dir: Path) -> List[ValidationIssue]:
+    issues: List[ValidationIssue] = []
+    with os.scandir(traj_steps_dir) as it:
+        step_dirs = [Path(entry.path) for entry in it if entry.is_dir()]
     if not step_dirs:
         issues.append(_issue(traj_steps_dir, "No steps found", "warning"))
 
@@ -51,26 +63,45 @@ def validate_trajectory_dir(
             issues.append(_issue(traj_steps_dir, "Step indices are not contiguous", "warning"))
 
     for entry in step_dirs:
-        action_file = paths.action_path(entry)
-        ui_tree_file = paths.ui_tree_path(entry)
-        screenshot_file = paths.screenshot_path(entry)
-        if not action_file.exists():
-            issues.append(_issue(action_file, "Missing action.json", "error"))
-        if not ui_tree_file.exists():
-            issues.append(_issue(ui_tree_file, "Missing ui_tree.json", "error"))
-        if not screenshot_file.exists():
-            issues.append(_issue(screenshot_file, "Missing screenshot.png", "error"))
+        names = _entry_names(entry)
+        if ACTION_FILENAME not in names:
+            issues.append(_issue(paths.action_path(entry), "Missing action.json", "error"))
+        if UI_TREE_FILENAME not in names:
+            issues.append(_issue(paths.ui_tree_path(entry), "Missing ui_tree.json", "error"))
+        if SCREENSHOT_FILENAME not in names:
+            issues.append(_issue(paths.screenshot_path(entry), "Missing screenshot.png", "error"))
+
+    return issues
+
+
+def validate_trajectory_dir(
+    trajectory_dir: Path,
+    require_final_screenshot: bool = False,
+    require_result: bool = False,
+) -> List[ValidationIssue]:
+    issues: List[ValidationIssue] = []
+    names = _entry_names(trajectory_dir)
+    if TASK_FILENAME not in names:
+        issues.append(_issue(paths.task_path(trajectory_dir), "Missing task.json", "error"))
+
+    # Steps stored in steps.parquet have no per-step files to check
+    if STEPS_PARQUET_FILENAME not in names:
+        traj_steps_dir = paths.steps_dir(trajectory_dir)
+        if STEPS_DIRNAME not in names:
+            issues.append(_issue(traj_steps_dir, "Missing steps directory", "error"))
+            return issues
+        issues.extend(_validate_step_dirs(traj_steps_dir))
 
     result_file = paths.result_path(trajectory_dir)
-    if require_result and not result_file.exists():
+    if require_result and RESULT_FILENAME not in names:
         issues.append(_issue(result_file, "Missing result.json", "error"))
-    elif not result_file.exists():
+    elif RESULT_FILENAME not in names:
         issues.append(_issue(result_file, "Missing result.json", "warning"))
 
     final_screenshot_file = paths.final_screenshot_path(trajectory_dir)
-    if require_final_screenshot and not final_screenshot_file.exists():
+    if require_final_screenshot and FINAL_SCREENSHOT_FILENAME not in names:
         issues.append(_issue(final_screenshot_file, "Missing final_screenshot.png", "error"))
-    elif not final_screenshot_file.exists():
+    elif FINAL_SCREENSHOT_FILENAME not in names:
         issues.append(_issue(final_screenshot_file, "Missing final_screenshot.png", "warning"))
 
     return issues
@@ -91,9 +122,11 @@ def validate_dataset_dir(dataset_dir: Path) -> List[ValidationIssue]:
     if not metadata_file.exists():
         issues.append(_issue(metadata_file, "Missing metadata.json", "warning"))
 
-    for trajectory_dir in traj_dir.iterdir():
-        if not trajectory_dir.is_dir():
-            continue
-        issues.extend(validate_trajectory_dir(trajectory_dir))
+    trajectory_dirs = [trajectory_dir for trajectory_dir in traj_dir.iterdir() if trajectory_dir.is_dir()]
+    # Validation is directory reads only; overlap them across threads.
+    # map() keeps results in trajectory order.
+    with ThreadPoolExecutor(max_workers=_VALIDATION_WORKERS) as executor:
+        for trajectory_issues in executor.map(validate_trajectory_dir, trajectory_dirs):
+            issues.extend(trajectory_issues)
 
     return issues
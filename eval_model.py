@@ -21,6 +21,8 @@ OUTPUT_FILE = f"eval_results_{MODEL_NAME}.jsonl"            # 评测结果保存
 # 格式: https://{bucket}.{endpoint}/{prefix}/
 # 例如: https://gui-test-zxh-0129.oss-cn-beijing.aliyuncs.com/benchmark_v1/
 OSS_BASE_URL = "https://gui-test-zxh-0129.oss-cn-beijing.aliyuncs.com/gui_grounding_benchmark_v1/"
+# 数据集是用 upload_to_oss.py --compress 上传的 (PNG 都转成了 .webp) 时设为 True
+OSS_WEBP = False
 
 # 4. 并发设置
 MAX_WORKERS = 5  # 根据 API 速率限制调整并发数
@@ -35,6 +37,8 @@ def construct_image_url(relative_path):
     # 移除可能的开头的 /
     if relative_path.startswith('/'):
         relative_path = relative_path[1:]
+    if OSS_WEBP and relative_path.lower().endswith('.png'):
+        relative_path = relative_path[:-4] + '.webp'
     return f"{OSS_BASE_URL}{relative_path}"
 
 def parse_model_response(content):
@@ -94,6 +94,7 @@ class CDPSession:
     def __init__(self, ws_url, timeout=10):
         self.ws = websocket.create_connection(ws_url, timeout=timeout)
         self.msg_id = 0
+        self.events = []  # Events received while waiting for command results
 
     def send(self, method, params=None):
         """Send a CDP command and return the result."""
@@ -109,6 +110,27 @@ class CDPSession:
                 if "error" in response:
                     return {"error": response["error"]}
                 return response.get("result")
+            if "method" in response:
+                self.events.append(response)
+
+    def wait_event(self, method, timeout):
+        """Wait up to timeout seconds for a CDP event; return its params or None."""
+        for event in self.events:
+            if event["method"] == method:
+                return event.get("params", {})
+
+        deadline = time.time() + timeout
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            self.ws.settimeout(remaining)
+            try:
+                message = json.loads(self.ws.recv())
+            except websocket.WebSocketTimeoutException:
+                return None
+            if message.get("method") == method:
+                return message.get("params", {})
 
     def close(self):
         """Close the WebSocket connection."""
@@ -294,6 +316,32 @@ def get_all_tabs_layout():
     return {"tabs": results}
 
 
+def navigate_page(url, wait_load=False, timeout=10):
+    """Navigate the first open tab to url, optionally waiting for its load event."""
+    targets = get_cdp_targets()
+
+    if isinstance(targets, dict) and "error" in targets:
+        return targets
+
+    for target in targets:
+        if target.get("type") == "page" and target.get("webSocketDebuggerUrl"):
+            try:
+                with CDPSession(target["webSocketDebuggerUrl"]) as session:
+                    if wait_load:
+                        session.send("Page.enable")
+                    result = session.send("Page.navigate", {"url": url}) or {}
+                    if result.get("errorText"):
+                        return {"error": result["errorText"]}
+                    if wait_load:
+                        # A slow page is not an error; report it and let the caller go on
+                        result["loaded"] = session.wait_event("Page.loadEventFired", timeout) is not None
+                    return result
+            except Exception as e:
+                return {"error": str(e)}
+
+    return {"error": "No page target available"}
+
+
 class APIHandler(http.server.BaseHTTPRequestHandler):
     """HTTP request handler for the DOM API."""
 
@@ -327,7 +375,25 @@ class APIHandler(http.server.BaseHTTPRequestHandler):
             self.send_json({"status": "ok", "chromium_pid": chromium_process.pid if chromium_process else None})
 
         else:
-            self.send_json({"error": "Not found", "endpoints": ["/", "/layout", "/targets", "/tabs", "/health"]}, 404)
+            self.send_json({"error": "Not found", "endpoints": ["/", "/layout", "/targets", "/tabs", "/health", "/navigate"]}, 404)
+
+    def do_POST(self):
+        """Handle POST requests."""
+        if self.path == "/navigate":
+            # Navigate the first tab; body is {"url": "...", "wait": "load", "timeout": 10}
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length))
+                url = body["url"]
+                timeout = float(body.get("timeout", 10))
+            except (ValueError, KeyError, TypeError) as e:
+                self.send_json({"error": f"Invalid request body: {e}"}, 400)
+                return
+            result = navigate_page(url, wait_load=body.get("wait") == "load", timeout=timeout)
+            self.send_json(result, 502 if "error" in result else 200)
+
+        else:
+            self.send_json({"error": "Not found", "endpoints": ["/navigate"]}, 404)
 
 
 def run_api_server():
@@ -249,59 +249,42 @@ ROLE_MAP = {
     "RubyAnnotation": "label",
 }
 
+# Intern role targets so every converted node shares one string object per role
+ROLE_MAP = {key: sys.intern(value) for key, value in ROLE_MAP.items()}
 
-def get_ax_value(obj):
-    """Extract the value from an AXValue object."""
-    if obj is None:
-        return None
-    if isinstance(obj, dict):
-        return obj.get("value")
-    return obj
-
+UNKNOWN_ROLE = sys.intern("unknown")
 
-def map_role(ax_role):
-    """Map Chrome accessibility role to data_format role."""
-    if ax_role is None:
-        return "unknown"
-    role_str = str(ax_role)
+# Roles passed through as-is when Chrome already reports a data_format role
+_VALID_ROLES = frozenset({
+    "desktop", "window", "dialog", "panel", "toolbar", "menubar", "menu",
+    "menuitem", "button", "checkbox", "radiobutton", "textfield", "textarea",
+    "combobox", "listbox", "listitem", "tab", "tabpanel", "treeview", "treeitem",
+    "table", "tablecell", "scrollbar", "slider", "progressbar", "label", "link",
+    "image", "icon", "separator", "tooltip", "statusbar", "taskbar",
+})
 
-    # Try exact match first
-    if role_str in ROLE_MAP:
-        return ROLE_MAP[role_str]
 
-    # Try lowercase
-    role_lower = role_str.lower()
-    if role_lower in ROLE_MAP:
-        return ROLE_MAP[role_lower]
+def _build_role_lookup():
+    """Fold ROLE_MAP, its lowercase keys and _VALID_ROLES into one dict.
 
-    # Try common transformations
-    # "FooBar" -> "foobar", "fooBar" -> "foobar"
+    Precedence matches the original cascade: exact ROLE_MAP key, then a
+    lowercase ROLE_MAP key, then the first key equal ignoring case, then a
+    valid data_format role passed through.
+    """
+    lookup = dict(ROLE_MAP)
     for key, value in ROLE_MAP.items():
-        if key.lower() == role_lower:
-            return value
-
-    # Default: use the role as-is if it looks like a valid data_format role
-    valid_roles = {
-        "desktop", "window", "dialog", "panel", "toolbar", "menubar", "menu",
-        "menuitem", "button", "checkbox", "radiobutton", "textfield", "textarea",
-        "combobox", "listbox", "listitem", "tab", "tabpanel", "treeview", "treeitem",
-        "table", "tablecell", "scrollbar", "slider", "progressbar", "label", "link",
-        "image", "icon", "separator", "tooltip", "statusbar", "taskbar",
-    }
-    if role_lower in valid_roles:
-        return role_lower
-
-    # Track unmapped role for debugging
-    _unmapped_roles[role_str] += 1
-    return "unknown"
+        lookup.setdefault(key.lower(), value)
+    for role in _VALID_ROLES:
+        lookup.setdefault(role, sys.intern(role))
+    return lookup
 
 
-def get_states(node):
-    """Extract states from accessibility node properties."""
-    states = []
-    properties = node.get("properties", [])
+_ROLE_LOOKUP = _build_role_lookup()
 
-    state_map = {
+# State mapping from Chrome accessibility properties to data_format states
+STATE_MAP = {
+    name: sys.intern(state)
+    for name, state in {
         "focused": "focused",
         "selected": "selected",
         "checked": "checked",
@@ -314,40 +297,97 @@ def get_states(node):
         "pressed": "pressed",
         "busy": "active",
         "modal": "active",
-    }
+    }.items()
+}
 
+
+def get_ax_value(obj):
+    """Extract the value from an AXValue object."""
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get("value")
+    return obj
+
+
+def map_role(ax_role):
+    """Map Chrome accessibility role to data_format role."""
+    if ax_role is None:
+        return UNKNOWN_ROLE
+    role_str = str(ax_role)
+
+    # Exact match first, then case-insensitive ("FooBar" -> "foobar")
+    role = _ROLE_LOOKUP.get(role_str) or _ROLE_LOOKUP.get(role_str.lower())
+    if role is None:
+        # Track unmapped role for debugging
+        _unmapped_roles[role_str] += 1
+        return UNKNOWN_ROLE
+    return role
+
+
+def unwrap_properties(properties):
+    """Flatten AX properties into parallel (names, values) lists.
+
+    Values are unwrapped from their AXValue dicts here, once, so the state
+    extraction loop reads plain values without per-property calls.
+    """
+    names = []
+    values = []
     for prop in properties:
-        name = prop.get("name", "")
-        value = get_ax_value(prop.get("value"))
+        names.append(prop.get("name", ""))
+        value = prop.get("value")
+        values.append(value.get("value") if isinstance(value, dict) else value)
+    return names, values
+
+
+def get_states(node, properties=None):
+    """Extract states from accessibility node properties.
+
+    properties is the node's unwrap_properties() result, if already computed.
+    """
+    states = []
+    if properties is None:
+        properties = unwrap_properties(node.get("properties", []))
+    names, values = properties
 
-        if name in state_map and value is True:
-            states.append(state_map[name])
+    for name, value in zip(names, values):
+        if name in STATE_MAP and value is True:
+            states.append(STATE_MAP[name])
         elif name == "checked" and value == "true":
-            states.append("checked")
+            states.append(STATE_MAP["checked"])
         elif name == "expanded" and value is True:
-            states.append("expanded")
+            states.append(STATE_MAP["expanded"])
         elif name == "expanded" and value is False:
-            states.append("collapsed")
+            states.append(STATE_MAP["collapsed"])
 
     # Check if node is ignored (hidden)
     if node.get("ignored"):
         if "hidden" not in states:
-            states.append("hidden")
+            states.append(STATE_MAP["hidden"])
 
     return states if states else None
 
 
-def build_tree(nodes):
-    """Convert flat node list with childIds to hierarchical tree."""
+def build_tree(nodes, bounds_as_tuple=False, start_id=0):
+    """Convert flat node list with childIds to hierarchical tree.
+
+    Node ids are assigned in pre-order starting at node_{start_id}.
+
+    With bounds_as_tuple, node bounds are emitted as (x, y, width, height)
+    tuples instead of dicts. Only for in-process consumers such as the lisp
+    converter; the result is not valid ui_tree.json.
+    """
     if not nodes:
         return None
 
-    # Build lookup by nodeId
+    # Build lookup by nodeId, unwrapping each node's properties in the same pass
     node_map = {}
+    node_properties = {}
     for node in nodes:
         node_id = node.get("nodeId")
         if node_id:
             node_map[node_id] = node
+            node_properties[node_id] = unwrap_properties(node.get("properties", []))
 
     # Track which nodes are children (to find root)
     child_ids = set()
@@ -371,7 +411,7 @@ def build_tree(nodes):
         return None
 
     # Counter for generating sequential IDs
-    id_counter = [0]
+    id_counter = [start_id]
 
     def convert_node(ax_node):
         """Convert a single accessibility node to ui_tree format."""
@@ -383,7 +423,17 @@ def build_tree(nodes):
 
         # Get bounds
         bounds = ax_node.get("bounds")
-        if bounds:
+        if bounds_as_tuple:
+            if bounds:
+                ui_bounds = (
+                    int(bounds.get("x", 0)),
+                    int(bounds.get("y", 0)),
+                    int(bounds.get("width", 0)),
+                    int(bounds.get("height", 0)),
+                )
+            else:
+                ui_bounds = (0, 0, 0, 0)
+        elif bounds:
             ui_bounds = {
                 "x": int(bounds.get("x", 0)),
                 "y": int(bounds.get("y", 0)),
@@ -402,7 +452,7 @@ def build_tree(nodes):
         }
 
         # Add states if present
-        states = get_states(ax_node)
+        states = get_states(ax_node, node_properties.get(ax_node.get("nodeId")))
         if states:
             ui_node["states"] = states
 
@@ -430,14 +480,22 @@ def build_tree(nodes):
     return convert_node(root_node)
 
 
-def convert_layout_to_ui_tree(layout_response):
-    """Convert /layout response to ui_tree.json format."""
+def convert_layout_to_ui_tree(layout_response, bounds_as_tuple=False):
+    """Convert /layout response to ui_tree.json format.
+
+    See build_tree for bounds_as_tuple.
+    """
     # Get timestamp
     timestamp = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
 
     # Default screen size
     screen = {"width": 1920, "height": 1080}
 
+    def screen_bounds():
+        if bounds_as_tuple:
+            return (0, 0, screen["width"], screen["height"])
+        return {"x": 0, "y": 0, "width": screen["width"], "height": screen["height"]}
+
     # Process first tab (or could process all)
     tabs = layout_response.get("tabs", [])
     if not tabs:
@@ -448,7 +506,7 @@ def convert_layout_to_ui_tree(layout_response):
                 "id": "node_0",
                 "role": "desktop",
                 "name": "",
-                "bounds": {"x": 0, "y": 0, "width": screen["width"], "height": screen["height"]},
+                "bounds": screen_bounds(),
                 "children": [],
             },
         }
@@ -466,26 +524,18 @@ def convert_layout_to_ui_tree(layout_response):
             screen["height"] = int(visual.get("height", 1080))
 
     # Build hierarchical tree from flat nodes
-    root_content = build_tree(nodes)
+    # node_0 is reserved for the desktop root added below
+    root_content = build_tree(nodes, bounds_as_tuple, start_id=1)
 
     # Wrap in desktop root
     root = {
         "id": "node_0",
         "role": "desktop",
         "name": "",
-        "bounds": {"x": 0, "y": 0, "width": screen["width"], "height": screen["height"]},
+        "bounds": screen_bounds(),
     }
 
     if root_content:
-        # Renumber IDs since we added desktop root
-        def renumber_ids(node, start=1):
-            node["id"] = f"node_{start}"
-            next_id = start + 1
-            for child in node.get("children", []):
-                next_id = renumber_ids(child, next_id)
-            return next_id
-
-        renumber_ids(root_content, 1)
         root["children"] = [root_content]
 
     return {
@@ -7,6 +7,7 @@ Reads JSON from stdin, writes lisp-style text to stdout.
 Usage:
     cat ui_tree.json | python ui_tree_to_lisp.py
     curl http://localhost:8122/layout | python layout_to_ui_tree.py | python ui_tree_to_lisp.py
+    curl http://localhost:8122/layout | python ui_tree_to_lisp.py --from-layout
 
 Format Documentation:
 =====================
@@ -48,9 +49,11 @@ Options:
 --no-empty      : Skip nodes with empty names and no children
 --max-depth N   : Limit tree depth to N levels
 --min-size N    : Skip nodes smaller than NxN pixels
+--from-layout   : Read a raw /layout response and convert it in-process
 """
 
 import argparse
+import io
 import json
 import sys
 
@@ -67,13 +70,16 @@ def escape_string(s):
 
 
 def format_bounds(bounds):
-    """Format bounds as [x,y wxh]."""
+    """Format bounds as [x,y wxh]. Accepts a bounds dict or an (x, y, w, h) tuple."""
     if not bounds:
         return None
-    x = bounds.get("x", 0)
-    y = bounds.get("y", 0)
-    w = bounds.get("width", 0)
-    h = bounds.get("height", 0)
+    if isinstance(bounds, tuple):
+        x, y, w, h = bounds
+    else:
+        x = bounds.get("x", 0)
+        y = bounds.get("y", 0)
+        w = bounds.get("width", 0)
+        h = bounds.get("height", 0)
     return f"[{x},{y} {w}x{h}]"
 
 
@@ -84,86 +90,82 @@ def format_states(states):
     return " ".join(f":{s}" for s in states)
 
 
-def node_to_lisp(node, opts, depth=0):
-    """Convert a UI tree node to lisp format."""
-    if node is None:
-        return None
-
-    # Check depth limit
-    if opts.max_depth is not None and depth > opts.max_depth:
-        return None
-
-    role = node.get("role", "unknown")
-    name = node.get("name", "")
-    bounds = node.get("bounds")
-    states = node.get("states", [])
-    children = node.get("children", [])
-
-    # Check minimum size filter
-    if opts.min_size and bounds:
-        w = bounds.get("width", 0)
-        h = bounds.get("height", 0)
-        if w < opts.min_size and h < opts.min_size:
-            return None
-
-    # Skip empty nodes if requested
-    if opts.no_empty and not name and not children:
-        return None
-
-    # Build node parts
-    parts = [role]
-
-    # Add name if present
-    name_str = escape_string(name)
-    if name_str:
-        parts.append(name_str)
-
-    # Add bounds unless disabled
-    if not opts.no_bounds and bounds:
-        bounds_str = format_bounds(bounds)
-        if bounds_str:
-            parts.append(bounds_str)
-
-    # Add states unless disabled
-    if not opts.no_states and states:
-        states_str = format_states(states)
-        if states_str:
-            parts.append(states_str)
-
-    # Convert children
-    child_lisps = []
-    for child in children:
-        child_lisp = node_to_lisp(child, opts, depth + 1)
-        if child_lisp:
-            child_lisps.append(child_lisp)
-
-    # Format output
-    if opts.compact:
-        # Single line, no spaces between children
-        if child_lisps:
-            children_str = "".join(child_lisps)
-            return f"({' '.join(parts)}{children_str})"
-        else:
-            return f"({' '.join(parts)})"
-    else:
-        # Pretty printed with indentation
-        indent = "  " * depth
-        child_indent = "  " * (depth + 1)
-
-        if child_lisps:
-            # Multi-line with children
-            header = f"({' '.join(parts)}"
-            child_lines = []
-            for child_lisp in child_lisps:
-                # Indent each line of child
-                child_lines.append(child_indent + child_lisp.replace("\n", "\n" + child_indent))
-            return header + "\n" + "\n".join(child_lines) + ")"
-        else:
-            return f"({' '.join(parts)})"
-
-
-def convert_ui_tree_to_lisp(ui_tree, opts):
-    """Convert full ui_tree.json to lisp format."""
+def make_emitter(opts, write):
+    """Build emit(node, depth=0, prefix="") specialised for opts.
+
+    Options are fixed for a whole tree, so they are read once here and kept
+    as closure locals instead of attribute lookups on every node. emit writes
+    the node via write(); prefix (separator + indentation) is written only if
+    the node is emitted. emit returns True if anything was written.
+    """
+    max_depth = opts.max_depth
+    min_size = opts.min_size or 0
+    no_empty = opts.no_empty
+    show_bounds = not opts.no_bounds
+    show_states = not opts.no_states
+    compact = opts.compact
+
+    def emit(node, depth=0, prefix=""):
+        if node is None:
+            return False
+
+        # Check depth limit
+        if max_depth is not None and depth > max_depth:
+            return False
+
+        role = node.get("role", "unknown")
+        name = node.get("name", "")
+        bounds = node.get("bounds")
+        states = node.get("states", [])
+        children = node.get("children", [])
+
+        # Check minimum size filter
+        if min_size and bounds:
+            if isinstance(bounds, tuple):
+                w, h = bounds[2], bounds[3]
+            else:
+                w = bounds.get("width", 0)
+                h = bounds.get("height", 0)
+            if w < min_size and h < min_size:
+                return False
+
+        # Skip empty nodes if requested
+        if no_empty and not name and not children:
+            return False
+
+        # Build node parts
+        parts = [role]
+
+        # Add name if present
+        name_str = escape_string(name)
+        if name_str:
+            parts.append(name_str)
+
+        # Add bounds unless disabled
+        if show_bounds and bounds:
+            parts.append(format_bounds(bounds))
+
+        # Add states unless disabled
+        if show_states and states:
+            parts.append(format_states(states))
+
+        write(f"{prefix}({' '.join(parts)}")
+
+        # Children: single line with no separator in compact mode,
+        # otherwise one per line indented two spaces per level
+        if children and (max_depth is None or depth < max_depth):
+            child_prefix = "" if compact else "\n" + "  " * (depth + 1)
+            for child in children:
+                emit(child, depth + 1, child_prefix)
+
+        write(")")
+        return True
+
+    return emit
+
+
+def write_ui_tree_lisp(ui_tree, opts, write):
+    """Stream full ui_tree.json in lisp format via write()."""
     lines = []
 
     # Add header comment with metadata
@@ -180,14 +182,20 @@ def convert_ui_tree_to_lisp(ui_tree, opts):
                 lines.append(f";; screen: {w}x{h}")
             lines.append("")
 
+    write("\n".join(lines))
+
     # Convert root node
     root = ui_tree.get("root")
     if root:
-        root_lisp = node_to_lisp(root, opts)
-        if root_lisp:
-            lines.append(root_lisp)
+        emit = make_emitter(opts, write)
+        emit(root, prefix="\n" if lines else "")
 
-    return "\n".join(lines)
+
+def convert_ui_tree_to_lisp(ui_tree, opts):
+    """Convert full ui_tree.json to lisp format."""
+    buf = io.StringIO()
+    write_ui_tree_lisp(ui_tree, opts, buf.write)
+    return buf.getvalue()
 
 
 def main():
@@ -228,6 +236,11 @@ def main():
         default=None,
         help="Skip nodes smaller than NxN pixels",
     )
+    parser.add_argument(
+        "--from-layout",
+        action="store_true",
+        help="Input is a raw /layout response; convert it in-process",
+    )
 
     args = parser.parse_args()
 
@@ -238,9 +251,15 @@ def main():
         print(f"Error: Invalid JSON input: {e}", file=sys.stderr)
         return 1
 
-    # Convert and output
-    output = convert_ui_tree_to_lisp(ui_tree, args)
-    print(output)
+    if args.from_layout:
+        # Skip the intermediate ui_tree.json: tuple bounds avoid a dict per node
+        from layout_to_ui_tree import convert_layout_to_ui_tree
+        ui_tree = convert_layout_to_ui_tree(ui_tree, bounds_as_tuple=True)
+
+    # Stream output straight to stdout, no intermediate string
+    write_ui_tree_lisp(ui_tree, args, sys.stdout.write)
+    sys.stdout.write("\n")
+    sys.stdout.flush()
 
     return 0
 
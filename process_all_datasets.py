@@ -1,68 +1,101 @@
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PIL import UnidentifiedImageError
 from filter_ui_tree_v2 import filter_ui_tree
 from draw_filtered_bboxes import draw_filtered_bboxes
 
-def process_all_datasets(base_dir):
+def _process_one(task):
+    """
+    Run filtering and drawing for a single dataset.
+    Executed inside a worker process; returns (subdir_name, error_message).
+    Only expected per-dataset failures are reported; anything else propagates.
+    """
+    subdir_name, ui_tree_path, filtered_json_path, image_rel_path, output_image_path = task
+
+    print(f"Processing {subdir_name}...")
+
+    try:
+        # 1. Run filter_ui_tree
+        filter_ui_tree(ui_tree_path, filtered_json_path, image_rel_path)
+
+        # 2. Run draw_filtered_bboxes
+        draw_filtered_bboxes(filtered_json_path, output_image_path)
+
+    except (FileNotFoundError, ValueError, UnidentifiedImageError) as e:
+        return subdir_name, str(e)
+
+    return subdir_name, None
+
+def process_all_datasets(base_dir, max_workers=None):
     """
     Iterates through all subdirectories in dataset_cropped and applies
-    filtering and drawing scripts.
+    filtering and drawing scripts. Datasets are independent, so they are
+    processed in parallel across worker processes.
     """
     dataset_root = os.path.join(base_dir, "datasetv2_cropped")
-    
+
     if not os.path.exists(dataset_root):
         print(f"Error: {dataset_root} does not exist.")
         return
 
-    # iterate over all subdirectories
-    subdirs = [d for d in os.listdir(dataset_root) 
-               if os.path.isdir(os.path.join(dataset_root, d))]
-    
-    subdirs.sort()
-    
+    # iterate over all subdirectories (DirEntry caches the type, no extra stat)
+    with os.scandir(dataset_root) as it:
+        subdirs = sorted(e.name for e in it if e.is_dir())
+
     print(f"Found {len(subdirs)} datasets to process.")
-    
+
     success_count = 0
     fail_count = 0
-    
+
+    tasks = []
     for subdir_name in subdirs:
         subdir_path = os.path.join(dataset_root, subdir_name)
-        
-        # Check for required files
-        ui_tree_path = os.path.join(subdir_path, "ui_tree.json")
-        screenshot_path = os.path.join(subdir_path, "screenshot_cropped.png")
-        
-        if not os.path.exists(ui_tree_path):
+
+        # Check for required files with one directory read instead of a stat per file
+        with os.scandir(subdir_path) as it:
+            names = {e.name for e in it}
+
+        if "ui_tree.json" not in names:
             print(f"Skipping {subdir_name}: ui_tree.json not found")
             fail_count += 1
             continue
-            
-        if not os.path.exists(screenshot_path):
+
+        if "screenshot_cropped.png" not in names:
             print(f"Skipping {subdir_name}: screenshot_cropped.png not found")
             fail_count += 1
             continue
-            
-        print(f"Processing {subdir_name}...")
-        
-        try:
-            # 1. Run filter_ui_tree
-            filtered_json_path = os.path.join(subdir_path, "filtered.json")
-            # Image path relative to project root or absolute?
-            # In filter_ui_tree.py, we previously passed "dataset_cropped/github/screenshot_cropped.png"
-            # Here we should construct it similarly: "dataset_cropped/{subdir_name}/screenshot_cropped.png"
-            image_rel_path = os.path.join("datasetv2_cropped", subdir_name, "screenshot_cropped.png")
-            
-            filter_ui_tree(ui_tree_path, filtered_json_path, image_rel_path)
-            
-            # 2. Run draw_filtered_bboxes
-            output_image_path = os.path.join(subdir_path, "screenshot_bbox.png")
-            draw_filtered_bboxes(filtered_json_path, output_image_path)
-            
-            success_count += 1
-            
-        except Exception as e:
-            print(f"Error processing {subdir_name}: {e}")
+
+        ui_tree_path = os.path.join(subdir_path, "ui_tree.json")
+        if os.path.getsize(ui_tree_path) == 0:
+            print(f"Skipping {subdir_name}: ui_tree.json is empty")
             fail_count += 1
+            continue
+
+        filtered_json_path = os.path.join(subdir_path, "filtered.json")
+        # Image path relative to project root or absolute?
+        # In filter_ui_tree.py, we previously passed "dataset_cropped/github/screenshot_cropped.png"
+        # Here we should construct it similarly: "dataset_cropped/{subdir_name}/screenshot_cropped.png"
+        image_rel_path = os.path.join("datasetv2_cropped", subdir_name, "screenshot_cropped.png")
+        output_image_path = os.path.join(subdir_path, "screenshot_bbox.png")
+
+        tasks.append((subdir_name, ui_tree_path, filtered_json_path, image_rel_path, output_image_path))
+
+    if max_workers is None:
+        max_workers = os.cpu_count()
+
+    # Workers resolve image_rel_path against CWD, so pin it to base_dir in each one
+    with ProcessPoolExecutor(max_workers=max_workers,
+                             initializer=os.chdir, initargs=(base_dir,)) as ex:
+        futures = [ex.submit(_process_one, t) for t in tasks]
+
+        for future in as_completed(futures):
+            subdir_name, error = future.result()
+            if error is None:
+                success_count += 1
+            else:
+                print(f"Error processing {subdir_name}: {error}")
+                fail_count += 1
 
     print(f"\nProcessing complete.")
     print(f"Success: {success_count}")
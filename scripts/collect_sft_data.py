@@ -4,71 +4,113 @@ Collect SFT training data from desktopd + Chromium.
 
 Usage:
     python scripts/collect_sft_data.py --output ./data_format/sft_examples/20260202 --count 10
+
+    # Spread samples over containers started by scripts/start_workers.sh
+    python scripts/collect_sft_data.py --output ./data_format/sft_examples/20260202 --workers 5
+
+    # Rebuild index.json from the trajectories already in the output directory
+    python scripts/collect_sft_data.py --output ./data_format/sft_examples/20260202 --reindex
 """
 
 import argparse
+import functools
 import json
 import os
+import shutil
 import subprocess
 import sys
 import time
-import urllib.request
-import urllib.error
-from datetime import datetime, timezone
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
+from typing import Callable, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Add parent dir to path for data_format imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from image.layout_to_ui_tree import convert_layout_to_ui_tree
-
 # API endpoints
 DESKTOPD_URL = os.environ.get("DESKTOPD_URL", "http://localhost:8080")
 CDP_PORT = 9222
 
 # Container settings
 CONTAINER_NAME = "osworld"
-CONTAINER_RUNTIME = None  # Auto-detect
 
+# Keep-alive connections to desktopd and the DOM API, reused across calls.
+# Each worker process gets its own copy (nothing is sent before the fork).
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+SCREENSHOT_CHUNK_SIZE = 64 * 1024
+PAGE_LOAD_TIMEOUT = 10  # Seconds to wait for a page's load event
+
+# Network calls (screenshot, layout) run on IO_POOL. The layout -> ui_tree
+# conversion runs on CPU_POOL so it overlaps the step's action and settle time;
+# it holds the GIL, so one thread is all it can use.
+IO_POOL = ThreadPoolExecutor(max_workers=16)
+CPU_POOL = ThreadPoolExecutor(max_workers=1)
 
-def detect_runtime():
-    """Auto-detect docker or podman."""
-    global CONTAINER_RUNTIME
-    if CONTAINER_RUNTIME:
-        return CONTAINER_RUNTIME
 
+@functools.lru_cache(maxsize=1)
+def detect_runtime():
+    """Auto-detect docker or podman (looked up on PATH once, then cached)."""
     for cmd in ["podman", "docker"]:
-        try:
-            result = subprocess.run([cmd, "--version"], capture_output=True, timeout=5)
-            if result.returncode == 0:
-                CONTAINER_RUNTIME = cmd
-                return cmd
-        except (FileNotFoundError, subprocess.TimeoutExpired):
-            continue
+        if shutil.which(cmd):
+            return cmd
 
     raise RuntimeError("Neither docker nor podman found")
 
 
-def container_exec(cmd: str, user: str = "user") -> subprocess.CompletedProcess:
-    """Execute command inside container."""
-    runtime = detect_runtime()
-    full_cmd = [
-        runtime, "exec",
+@functools.lru_cache(maxsize=None)
+def exec_prefix(container: str, user: str = "user") -> tuple:
+    """argv prefix for running a command inside container as user."""
+    return (
+        detect_runtime(), "exec",
         "-u", user,
         "-e", "XDG_RUNTIME_DIR=/tmp/xdg",
         "-e", "WAYLAND_DISPLAY=wayland-1",
-        CONTAINER_NAME,
-        "sh", "-c", cmd
-    ]
+        container,
+    )
+
+
+def container_exec(cmd: str, user: str = "user") -> subprocess.CompletedProcess:
+    """Execute command inside container."""
+    full_cmd = [*exec_prefix(CONTAINER_NAME, user), "sh", "-c", cmd]
     return subprocess.run(full_cmd, capture_output=True, text=True, timeout=30)
 
 
+def write_json(path: Path, obj, indent: bool = True) -> None:
+    """Write obj as JSON, with orjson when available. indent=False writes compact JSON."""
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0))
+        return
+    with open(path, "w") as f:
+        if indent:
+            json.dump(obj, f, indent=2)
+        else:
+            json.dump(obj, f, separators=(",", ":"))
+
+
+def read_json(path: Path):
+    """Read a JSON file, with orjson when available."""
+    data = path.read_bytes()
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
 def get_screenshot(output_path: str) -> bool:
     """Capture screenshot via desktopd API."""
     try:
-        with urllib.request.urlopen(f"{DESKTOPD_URL}/api/v1/screenshot", timeout=10) as resp:
+        # Stream to disk so only one chunk of the PNG is held in memory
+        with SESSION.get(f"{DESKTOPD_URL}/api/v1/screenshot", timeout=10, stream=True) as resp:
+            resp.raise_for_status()
             with open(output_path, "wb") as f:
-                f.write(resp.read())
+                for chunk in resp.iter_content(SCREENSHOT_CHUNK_SIZE):
+                    f.write(chunk)
         return True
     except Exception as e:
         print(f"Error getting screenshot: {e}", file=sys.stderr)
@@ -81,59 +123,73 @@ DOM_API_URL = os.environ.get("DOM_API_URL", "http://localhost:8122")
 def get_cdp_layout() -> dict:
     """Get layout tree via chromium_with_api.py HTTP API."""
     try:
-        with urllib.request.urlopen(f"{DOM_API_URL}/layout", timeout=30) as resp:
-            return json.load(resp)
+        resp = SESSION.get(f"{DOM_API_URL}/layout", timeout=30)
+        resp.raise_for_status()
+        return resp.json()
     except Exception as e:
         print(f"Layout API error: {e}", file=sys.stderr)
         return {"tabs": []}
 
 
-def navigate_to_url(url: str) -> bool:
-    """Navigate Chromium to a URL via CDP (using container's websocket)."""
-    runtime = detect_runtime()
-    nav_script = f'''
+# Runs inside the container; the URL arrives as argv[1] and is JSON-escaped
+# into a fixed message template, never interpolated into the script source
+NAV_SCRIPT = '''
 import json
+import sys
 import urllib.request
 import websocket
 
+NAV_TEMPLATE = '{"id":1,"method":"Page.navigate","params":{"url":%s}}'
+
 with urllib.request.urlopen("http://127.0.0.1:9222/json", timeout=5) as resp:
     targets = json.load(resp)
 
 for t in targets:
     if t.get("type") == "page":
         ws = websocket.create_connection(t["webSocketDebuggerUrl"], timeout=10)
-        ws.send(json.dumps({{"id": 1, "method": "Page.navigate", "params": {{"url": "{url}"}}}}))
+        ws.send(NAV_TEMPLATE % json.dumps(sys.argv[1]))
         ws.recv()
         ws.close()
         break
 '''
+
+
+def navigate_to_url(url: str) -> bool:
+    """Navigate Chromium to a URL via the DOM API; returns once the page has loaded."""
+    try:
+        resp = SESSION.post(f"{DOM_API_URL}/navigate",
+                            json={"url": url, "wait": "load", "timeout": PAGE_LOAD_TIMEOUT}, timeout=30)
+        # 404/501: the image predates /navigate (no POST handler)
+        if resp.status_code not in (404, 501):
+            if not resp.ok:
+                print(f"Nav error: {resp.json().get('error')}", file=sys.stderr)
+            return resp.ok
+    except Exception as e:
+        print(f"Nav error: {e}", file=sys.stderr)
+        return False
+
+    return navigate_via_exec(url)
+
+
+def navigate_via_exec(url: str) -> bool:
+    """Navigate Chromium to a URL via CDP (using container's websocket)."""
     # Run via subprocess with script as argument
-    full_cmd = [
-        runtime, "exec",
-        "-u", "user",
-        "-e", "XDG_RUNTIME_DIR=/tmp/xdg",
-        "-e", "WAYLAND_DISPLAY=wayland-1",
-        CONTAINER_NAME,
-        "python3", "-c", nav_script
-    ]
+    full_cmd = [*exec_prefix(CONTAINER_NAME), "python3", "-c", NAV_SCRIPT, url]
     result = subprocess.run(full_cmd, capture_output=True, text=True, timeout=30)
     if result.returncode != 0:
         print(f"Nav error: {result.stderr}", file=sys.stderr)
-    return result.returncode == 0
+        return False
+    time.sleep(3)  # No load event on this path; wait for page load
+    return True
 
 
 def send_click(x: int, y: int) -> bool:
     """Send click via desktopd tablet API."""
-    data = json.dumps({"events": [{"type": "click", "x": x, "y": y, "button": "left"}]}).encode()
-    req = urllib.request.Request(
-        f"{DESKTOPD_URL}/api/v1/tablet_event",
-        data=data,
-        headers={"Content-Type": "application/json"},
-        method="POST"
-    )
+    data = {"events": [{"type": "click", "x": x, "y": y, "button": "left"}]}
     try:
-        with urllib.request.urlopen(req, timeout=5) as resp:
-            return resp.status == 204
+        resp = SESSION.post(f"{DESKTOPD_URL}/api/v1/tablet_event", json=data, timeout=5)
+        resp.raise_for_status()
+        return resp.status_code == 204
     except Exception as e:
         print(f"Click error: {e}", file=sys.stderr)
         return False
@@ -141,71 +197,85 @@ def send_click(x: int, y: int) -> bool:
 
 def send_keyboard(text: str) -> bool:
     """Send text input via desktopd keyboard API."""
-    events = []
-    for char in text:
-        events.append({"keysym": char, "state": "down"})
-        events.append({"keysym": char, "state": "up"})
-
-    data = json.dumps({"events": events}).encode()
-    req = urllib.request.Request(
-        f"{DESKTOPD_URL}/api/v1/keyboard_event",
-        data=data,
-        headers={"Content-Type": "application/json"},
-        method="POST"
-    )
+    # A down/up pair per character
+    events = [event for char in text
+              for event in ({"keysym": char, "state": "down"}, {"keysym": char, "state": "up"})]
+
     try:
-        with urllib.request.urlopen(req, timeout=5) as resp:
-            return resp.status == 204
+        resp = SESSION.post(f"{DESKTOPD_URL}/api/v1/keyboard_event", json={"events": events}, timeout=5)
+        resp.raise_for_status()
+        return resp.status_code == 204
     except Exception as e:
         print(f"Keyboard error: {e}", file=sys.stderr)
         return False
 
 
-def collect_step(output_dir: Path, step_index: int, action: dict) -> bool:
-    """Collect one step: screenshot, ui_tree, action."""
+@functools.lru_cache(maxsize=1)
+def ui_tree_converter():
+    """Import the layout converter on first use, so --help stays fast."""
+    from image.layout_to_ui_tree import convert_layout_to_ui_tree
+    return convert_layout_to_ui_tree
+
+
+def convert_and_save_ui_tree(layout: dict, ui_tree_path: Path) -> None:
+    """Convert a layout response to ui_tree.json. Runs on CPU_POOL."""
+    write_json(ui_tree_path, ui_tree_converter()(layout), indent=False)
+
+
+def collect_step(output_dir: Path, step_index: int, action: dict) -> Optional[Future]:
+    """Collect one step: screenshot, ui_tree, action.
+
+    The ui_tree is converted and written on CPU_POOL while the caller goes on
+    to execute the action; returns that job's future, or None on failure.
+    """
     step_dir = output_dir / "steps" / f"{step_index:03d}"
-    step_dir.mkdir(parents=True, exist_ok=True)
+    step_dir.mkdir(exist_ok=True)  # steps/ is created by collect_trajectory
 
-    # Screenshot
+    # Screenshot and layout are independent requests; fetch them concurrently
     screenshot_path = step_dir / "screenshot.png"
-    if not get_screenshot(str(screenshot_path)):
-        return False
+    shot = IO_POOL.submit(get_screenshot, str(screenshot_path))
+    layout = IO_POOL.submit(get_cdp_layout)
+    if not shot.result():
+        return None
 
     # UI tree
-    layout = get_cdp_layout()
-    ui_tree = convert_layout_to_ui_tree(layout)
-    ui_tree_path = step_dir / "ui_tree.json"
-    with open(ui_tree_path, "w") as f:
-        json.dump(ui_tree, f, indent=2)
+    ui_tree_job = CPU_POOL.submit(convert_and_save_ui_tree, layout.result(), step_dir / "ui_tree.json")
 
     # Action
     action["step_index"] = step_index
     action_path = step_dir / "action.json"
-    with open(action_path, "w") as f:
-        json.dump(action, f, indent=2)
+    write_json(action_path, action)
+
+    return ui_tree_job
 
-    return True
 
+def collect_trajectory(output_dir: Path, task: dict, actions: list,
+                       on_captured: Optional[Callable[[], None]] = None) -> bool:
+    """Collect a complete trajectory.
 
-def collect_trajectory(output_dir: Path, task: dict, actions: list) -> bool:
-    """Collect a complete trajectory."""
+    on_captured is called once the final screenshot is taken, i.e. as soon as
+    the browser is no longer needed, before the remaining ui_tree jobs finish.
+    """
     traj_id = task["task_id"]
     traj_dir = output_dir / "trajectories" / traj_id
-    traj_dir.mkdir(parents=True, exist_ok=True)
+    # Creates traj_dir too; each step then only needs its own leaf directory
+    (traj_dir / "steps").mkdir(parents=True, exist_ok=True)
 
     # Save task
     task_path = traj_dir / "task.json"
-    with open(task_path, "w") as f:
-        json.dump(task, f, indent=2)
+    write_json(task_path, task)
 
     # Collect steps
-    start_time = time.time()
+    start_ns = time.perf_counter_ns()
+    ui_tree_jobs = []
     for i, action in enumerate(actions):
         print(f"  Step {i}: {action['action_type']}", file=sys.stderr)
 
-        if not collect_step(traj_dir, i, action):
+        ui_tree_job = collect_step(traj_dir, i, action)
+        if ui_tree_job is None:
             print(f"  Failed to collect step {i}", file=sys.stderr)
             return False
+        ui_tree_jobs.append(ui_tree_job)
 
         # Execute action
         if action["action_type"] == "click":
@@ -215,15 +285,22 @@ def collect_trajectory(output_dir: Path, task: dict, actions: list) -> bool:
             send_keyboard(action["parameters"]["text"])
         elif action["action_type"] == "wait":
             time.sleep(action["parameters"].get("seconds", 1))
+            continue  # The wait itself lets the UI settle
 
         time.sleep(0.5)  # Wait for UI to update
 
     # Final screenshot
     final_path = traj_dir / "final_screenshot.png"
     get_screenshot(str(final_path))
+    if on_captured:
+        on_captured()
+
+    # All ui_tree.json files must be on disk before the trajectory counts as done
+    for ui_tree_job in ui_tree_jobs:
+        ui_tree_job.result()
 
     # Result
-    elapsed = int((time.time() - start_time) * 1000)
+    elapsed = (time.perf_counter_ns() - start_ns) // 1_000_000
     result = {
         "trajectory_id": traj_id,
         "success": True,
@@ -233,12 +310,94 @@ def collect_trajectory(output_dir: Path, task: dict, actions: list) -> bool:
         "model_info": {"name": "human", "version": "1.0"}
     }
     result_path = traj_dir / "result.json"
-    with open(result_path, "w") as f:
-        json.dump(result, f, indent=2)
+    write_json(result_path, result)
 
     return True
 
 
+def run_one_sample(output_dir: Path, sample: dict, navigation: Optional[Future] = None,
+                   on_captured: Optional[Callable[[], None]] = None) -> Optional[dict]:
+    """Navigate to the sample's URL and collect its trajectory.
+
+    navigation is a navigate_to_url() job already started for this sample, if
+    any. Returns the trajectory's index entry, or None if collection failed.
+    """
+    task = sample["task"]
+    url = sample["url"]
+
+    print(f"\n[{CONTAINER_NAME}] {task['task_id']}: {task['instruction']}", file=sys.stderr)
+
+    # Navigate to URL (or wait for the prefetch started during the previous sample)
+    if navigation:
+        print(f"  Waiting for prefetched {url}...", file=sys.stderr)
+        navigated = navigation.result()
+    else:
+        print(f"  Navigating to {url}...", file=sys.stderr)
+        navigated = navigate_to_url(url)
+    if not navigated:
+        print(f"  Failed to navigate", file=sys.stderr)
+        return None
+
+    # Collect trajectory
+    if collect_trajectory(output_dir, task, sample["actions"], on_captured):
+        print(f"  Success!", file=sys.stderr)
+        return {
+            "id": task["task_id"],
+            "task_id": task["task_id"],
+            "success": True,
+            "steps": len(sample["actions"]),
+            "application": task.get("application")
+        }
+    print(f"  Failed!", file=sys.stderr)
+    return None
+
+
+def prefetch_navigation(url: str, into: list) -> None:
+    """Start loading url on IO_POOL, appending the job to into."""
+    into.append(IO_POOL.submit(navigate_to_url, url))
+
+
+def collect_samples(output_dir: Path, samples: list) -> list:
+    """Collect samples in order on this process's container.
+
+    The next sample's page starts loading as soon as the current trajectory's
+    final screenshot is taken, overlapping its pending ui_tree conversions and
+    result.json write. Returns one index entry (or None) per sample.
+    """
+    entries = []
+    navigation = None
+    for i, sample in enumerate(samples):
+        prefetch = []
+        on_captured = None
+        if i + 1 < len(samples):
+            on_captured = functools.partial(prefetch_navigation, samples[i + 1]["url"], prefetch)
+        entries.append(run_one_sample(output_dir, sample, navigation, on_captured))
+        navigation = prefetch[0] if prefetch else None
+
+    return entries
+
+
+def collect_share(output_dir: Path, target: tuple, samples: list) -> list:
+    """Collect samples on the container given by target in this worker process.
+
+    Each container runs a single browser and desktopd only captures the
+    foreground window, so shares cannot share one browser; every share is
+    submitted with its own (container, desktopd, DOM API) target.
+    """
+    global CONTAINER_NAME, DESKTOPD_URL, DOM_API_URL
+    CONTAINER_NAME, DESKTOPD_URL, DOM_API_URL = target
+    return collect_samples(output_dir, samples)
+
+
+def worker_targets(num_workers: int, base_port: int) -> list:
+    """Container targets laid out as in scripts/start_workers.sh."""
+    return [
+        (f"osworld-{i}", f"http://localhost:{base_port + i * 10}",
+         f"http://localhost:{base_port + 42 + i * 10}")
+        for i in range(num_workers)
+    ]
+
+
 # Sample tasks for data collection
 SAMPLE_TASKS = [
     {
@@ -374,75 +533,106 @@ SAMPLE_TASKS = [
 ]
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Collect SFT training data")
-    parser.add_argument("--output", "-o", required=True, help="Output directory")
-    parser.add_argument("--count", "-n", type=int, default=10, help="Number of samples to collect")
-    args = parser.parse_args()
+def run(output_dir: Path, count: int, workers: int = 1, base_port: int = 8080) -> int:
+    """Collect up to count samples into output_dir and write its index.json.
 
-    output_dir = Path(args.output)
+    Library entry point (no argument parsing); returns the number of
+    trajectories collected.
+    """
+    output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    print(f"Collecting {args.count} samples to {output_dir}", file=sys.stderr)
+    print(f"Collecting {count} samples to {output_dir}", file=sys.stderr)
     print(f"Using container runtime: {detect_runtime()}", file=sys.stderr)
 
-    collected = 0
-    for i, sample in enumerate(SAMPLE_TASKS[:args.count]):
-        task = sample["task"]
-        url = sample["url"]
-        actions = sample["actions"]
-
-        print(f"\n[{i+1}/{args.count}] {task['task_id']}: {task['instruction']}", file=sys.stderr)
-
-        # Navigate to URL
-        print(f"  Navigating to {url}...", file=sys.stderr)
-        if not navigate_to_url(url):
-            print(f"  Failed to navigate", file=sys.stderr)
-            continue
-        time.sleep(3)  # Wait for page load
-
-        # Collect trajectory
-        if collect_trajectory(output_dir, task, actions):
-            collected += 1
-            print(f"  Success!", file=sys.stderr)
-        else:
-            print(f"  Failed!", file=sys.stderr)
-
-    print(f"\nCollected {collected}/{args.count} samples", file=sys.stderr)
-
-    # Create index
+    samples = SAMPLE_TASKS[:count]
+
+    if workers <= 1:
+        results = collect_samples(output_dir, samples)
+    else:
+        # Exactly one share per container, submitted together with its target,
+        # to a pool with one process per share. The pool does not pin tasks to
+        # processes, but the share/container pairing is fixed by the task, so a
+        # container never picks up another container's samples. Samples are
+        # I/O bound, so throughput scales with the number of containers
+        targets = worker_targets(workers, base_port)
+        shares = [samples[i::workers] for i in range(workers)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(collect_share, output_dir, target, share)
+                       for target, share in zip(targets, shares)]
+            results = [entry for future in futures for entry in future.result()]
+
+    # Index entries come back from collection; no need to re-read them from disk
+    entries = sorted((entry for entry in results if entry), key=lambda entry: entry["id"])
+    collected = len(entries)
+
+    print(f"\nCollected {collected}/{count} samples", file=sys.stderr)
+
+    write_index(output_dir, entries)
+    return collected
+
+
+def write_index(output_dir: Path, entries: list) -> None:
+    """Write output_dir/index.json listing entries."""
+    from datetime import datetime, timezone
+    successful = sum(1 for entry in entries if entry["success"])
     index = {
         "version": "1.0",
-        "total_trajectories": collected,
-        "successful": collected,
-        "failed": 0,
+        "total_trajectories": len(entries),
+        "successful": successful,
+        "failed": len(entries) - successful,
         "created_at": datetime.now(timezone.utc).isoformat(),
-        "trajectories": []
+        "trajectories": entries
     }
 
+    index_path = output_dir / "index.json"
+    write_json(index_path, index)
+
+    print(f"Index written to {index_path}", file=sys.stderr)
+
+
+def index_entries_from_disk(output_dir: Path) -> list:
+    """Index entries for every trajectory under output_dir with task and result files.
+
+    Used by --reindex for trajectories that were not collected by this run
+    (earlier runs, other machines, hand-edited data).
+    """
+    entries = []
     traj_dir = output_dir / "trajectories"
     if traj_dir.exists():
         for traj_path in sorted(traj_dir.iterdir()):
             task_file = traj_path / "task.json"
             result_file = traj_path / "result.json"
             if task_file.exists() and result_file.exists():
-                with open(task_file) as f:
-                    task = json.load(f)
-                with open(result_file) as f:
-                    result = json.load(f)
-                index["trajectories"].append({
+                task = read_json(task_file)
+                result = read_json(result_file)
+                entries.append({
                     "id": traj_path.name,
                     "task_id": task["task_id"],
                     "success": result["success"],
                     "steps": result["total_steps"],
                     "application": task.get("application")
                 })
+    return entries
 
-    index_path = output_dir / "index.json"
-    with open(index_path, "w") as f:
-        json.dump(index, f, indent=2)
 
-    print(f"Index written to {index_path}", file=sys.stderr)
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Collect SFT training data")
+    parser.add_argument("--output", "-o", required=True, help="Output directory")
+    parser.add_argument("--count", "-n", type=int, default=10, help="Number of samples to collect")
+    parser.add_argument("--workers", "-w", type=int, default=1,
+                        help="Number of containers (osworld-0..N-1) to collect from in parallel")
+    parser.add_argument("--base-port", type=int, default=8080,
+                        help="desktopd port of osworld-0 (see scripts/start_workers.sh)")
+    parser.add_argument("--reindex", action="store_true",
+                        help="Only rebuild index.json from the trajectories already in --output")
+    args = parser.parse_args(argv)
+
+    if args.reindex:
+        write_index(Path(args.output), index_entries_from_disk(Path(args.output)))
+        return 0
+
+    collected = run(Path(args.output), args.count, args.workers, args.base_port)
     return 0 if collected > 0 else 1
 
 
@@ -13,25 +13,43 @@ Usage:
 """
 
 import argparse
+import ctypes
+import hashlib
+import io
 import json
 import os
+import queue
+import shutil
+import socket
 import subprocess
 import sys
+import tempfile
 import time
-import urllib.request
-import urllib.error
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
-from threading import Lock
+from typing import Optional
+from threading import Lock, Thread
+
+import urllib3
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Add parent dir to path for data_format imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from image.layout_to_ui_tree import convert_layout_to_ui_tree
 
-# Container settings
-CONTAINER_RUNTIME = None  # Auto-detect
+# Wall-clock caps so a hung container cannot stall the run
+TRAJECTORY_BUDGET = 60  # seconds per trajectory
+TASK_BUDGET = 30  # seconds per task, summed into the whole-run budget
+PAGE_LOAD_TIMEOUT = 10  # Seconds /navigate waits for a page's load event
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+EMPTY_LAYOUT = b'{"tabs": []}'  # Stand-in when /layout cannot be fetched
 
 # Thread-safe print lock
 print_lock = Lock()
@@ -43,17 +61,86 @@ def safe_print(msg):
         print(msg, file=sys.stderr)
 
 
+def json_loads(data: bytes):
+    """Parse JSON bytes, with orjson when available."""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def json_dumps(obj) -> bytes:
+    """Encode obj as compact JSON bytes, with orjson when available."""
+    return orjson.dumps(obj) if orjson is not None else json.dumps(obj, separators=(",", ":")).encode()
+
+
+def write_bytes(path: Path, data: bytes) -> None:
+    """Write data to path through a raw fd, looping until every byte is written."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        # os.write may write less than asked (large buffers, signals, network
+        # filesystems); a short write would otherwise leave a truncated file
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+def encode_json(obj, indent: bool = True) -> bytes:
+    """Encode obj as JSON bytes, with orjson when available. indent=False gives compact JSON."""
+    if not indent:
+        return json_dumps(obj)
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode()
+
+
+def write_json(path: Path, obj, indent: bool = True) -> None:
+    """Write obj as JSON, with orjson when available. indent=False writes compact JSON."""
+    write_bytes(path, encode_json(obj, indent))
+
+
+def write_shared(path: Path, data: bytes, key: bytes, store: Path) -> None:
+    """Hard-link path to a copy of data in store, addressed by a hash of key.
+
+    The copy is written to a temp file and published with os.link, so the
+    shared name only ever points at a complete file; identical ui_trees across
+    steps and trajectories share one file on disk.
+    """
+    shared = store / f"{hashlib.blake2b(key, digest_size=16).hexdigest()}.json"
+    if not shared.exists():
+        fd, tmp = tempfile.mkstemp(dir=store, suffix=".tmp")
+        os.close(fd)
+        try:
+            write_bytes(Path(tmp), data)
+            os.link(tmp, shared)
+        except FileExistsError:
+            pass  # another writer published the same blob first
+        finally:
+            os.unlink(tmp)
+    path.unlink(missing_ok=True)
+    os.link(shared, path)
+
+
+def syncfs(path: Path) -> None:
+    """Flush the filesystem holding path with one syncfs(2); os.sync() where unavailable."""
+    libc_syncfs = getattr(ctypes.CDLL(None, use_errno=True), "syncfs", None)
+    if libc_syncfs is None:
+        os.sync()
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        if libc_syncfs(fd) != 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), str(path))
+    finally:
+        os.close(fd)
+
+
 def detect_runtime():
     """Auto-detect docker or podman."""
-    global CONTAINER_RUNTIME
-    if CONTAINER_RUNTIME:
-        return CONTAINER_RUNTIME
-
     for cmd in ["podman", "docker"]:
         try:
             result = subprocess.run([cmd, "--version"], capture_output=True, timeout=5)
             if result.returncode == 0:
-                CONTAINER_RUNTIME = cmd
                 return cmd
         except (FileNotFoundError, subprocess.TimeoutExpired):
             continue
@@ -61,140 +148,209 @@ def detect_runtime():
     raise RuntimeError("Neither docker nor podman found")
 
 
+# Runs inside the container; the URL arrives as argv[1] and is JSON-escaped
+# into a fixed message template, never interpolated into the script source
+NAV_SCRIPT = '''
+import json
+import sys
+import urllib.request
+import websocket
+
+NAV_TEMPLATE = '{"id":1,"method":"Page.navigate","params":{"url":%s}}'
+
+with urllib.request.urlopen("http://127.0.0.1:9222/json", timeout=5) as resp:
+    targets = json.load(resp)
+
+for t in targets:
+    if t.get("type") == "page":
+        ws = websocket.create_connection(t["webSocketDebuggerUrl"], timeout=10)
+        ws.send(NAV_TEMPLATE % json.dumps(sys.argv[1]))
+        ws.recv()
+        ws.close()
+        break
+'''
+
+
 class ContainerWorker:
     """Worker that manages a single container instance."""
 
-    def __init__(self, worker_id: int, base_port: int = 8080):
+    def __init__(self, worker_id: int, runtime: str, base_port: int = 8080,
+                 pretty: bool = False, durable: bool = False, image_format: str = "png",
+                 ui_tree_store: Optional[Path] = None):
         self.worker_id = worker_id
         self.container_name = f"osworld-{worker_id}"
         self.desktopd_port = base_port + worker_id * 10
         self.dom_api_port = base_port + 42 + worker_id * 10  # 8122, 8132, etc.
         self.desktopd_url = f"http://localhost:{self.desktopd_port}"
         self.dom_api_url = f"http://localhost:{self.dom_api_port}"
-        self.runtime = detect_runtime()
+        self.runtime = runtime
+        # Step files are machine-read; indent them only when debugging
+        self.pretty = pretty
+        # Flush each finished trajectory to disk; off by default, the data is regenerable
+        self.durable = durable
+        # "png" stores desktopd's bytes as-is; "webp" re-encodes them
+        self.image_format = image_format
+        # Content-addressed ui_tree directory to hard-link step files into, if set
+        self.ui_tree_store = ui_tree_store
+        # Digest of the last /layout response and its converted ui_tree
+        self._last_layout_digest = None
+        self._last_ui_tree = None
+        # Keep-alive connections to this container's desktopd and DOM API;
+        # the worker runs one task at a time, so a few slots per host suffice
+        self.http = urllib3.PoolManager(num_pools=2, maxsize=4, retries=False)
+
+    def request(self, method: str, url: str, read_timeout: float, **kwargs) -> urllib3.HTTPResponse:
+        """Issue a request over this worker's connection pool."""
+        return self.http.request(method, url, timeout=urllib3.Timeout(connect=2.0, read=read_timeout), **kwargs)
 
     def is_ready(self) -> bool:
-        """Check if container is ready."""
+        """Check if container is ready.
+
+        A TCP connect to desktopd rules out stopped containers cheaply; the DOM
+        API's /health then confirms the browser is up, without making desktopd
+        capture and encode a screenshot just to throw it away.
+        """
         try:
-            with urllib.request.urlopen(f"{self.desktopd_url}/api/v1/screenshot", timeout=5) as resp:
-                return resp.status == 200
+            socket.create_connection(("localhost", self.desktopd_port), timeout=2).close()
+            resp = self.request("GET", f"{self.dom_api_url}/health", 5)
+            return resp.status == 200
         except Exception:
             return False
 
     def get_screenshot(self, output_path: str) -> bool:
         """Capture screenshot via desktopd API."""
         try:
-            with urllib.request.urlopen(f"{self.desktopd_url}/api/v1/screenshot", timeout=10) as resp:
-                with open(output_path, "wb") as f:
-                    f.write(resp.read())
+            # PNG streams to disk in 64 KiB chunks instead of holding the whole image
+            resp = self.request("GET", f"{self.desktopd_url}/api/v1/screenshot", 10, preload_content=False)
+            try:
+                if resp.status != 200:
+                    safe_print(f"[Worker {self.worker_id}] Screenshot error: HTTP {resp.status}")
+                    return False
+                if self.image_format == "webp":
+                    from PIL import Image
+                    Image.open(io.BytesIO(resp.read())).save(output_path, "WEBP", quality=85, method=4)
+                else:
+                    with open(output_path, "wb") as f:
+                        shutil.copyfileobj(resp, f, length=64 * 1024)
+            finally:
+                resp.release_conn()
             return True
         except Exception as e:
             safe_print(f"[Worker {self.worker_id}] Screenshot error: {e}")
             return False
 
-    def get_cdp_layout(self) -> dict:
-        """Get layout tree via chromium_with_api.py HTTP API."""
-        try:
-            with urllib.request.urlopen(f"{self.dom_api_url}/layout", timeout=30) as resp:
-                return json.load(resp)
-        except Exception as e:
-            safe_print(f"[Worker {self.worker_id}] Layout API error: {e}")
-            return {"tabs": []}
+    def get_cdp_layout(self) -> bytes:
+        """Get the raw layout JSON via chromium_with_api.py HTTP API, retrying once."""
+        error = None
+        for _ in range(2):
+            try:
+                resp = self.request("GET", f"{self.dom_api_url}/layout", 10)
+                if resp.status == 200:
+                    return resp.data
+                error = f"HTTP {resp.status}"
+            except Exception as e:
+                error = e
+        safe_print(f"[Worker {self.worker_id}] Layout API error: {error}")
+        return EMPTY_LAYOUT
+
+    def layout_to_ui_tree(self, raw_layout: bytes) -> dict:
+        """Convert a raw /layout response, reusing the last tree if the layout is unchanged."""
+        digest = hashlib.blake2b(raw_layout, digest_size=16).digest()
+        if digest != self._last_layout_digest:
+            self._last_ui_tree = convert_layout_to_ui_tree(json_loads(raw_layout))
+            self._last_layout_digest = digest
+            return self._last_ui_tree
+        # Same page state: only the capture time is new
+        return {**self._last_ui_tree, "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")}
 
     def navigate_to_url(self, url: str) -> bool:
-        """Navigate Chromium to a URL via CDP."""
-        nav_script = f'''
-import json
-import urllib.request
-import websocket
+        """Navigate Chromium to a URL via the DOM API; returns once the page has loaded."""
+        body = json_dumps({"url": url, "wait": "load", "timeout": PAGE_LOAD_TIMEOUT})
+        try:
+            resp = self.request("POST", f"{self.dom_api_url}/navigate", 30, body=body, headers=_JSON_HEADERS)
+        except Exception as e:
+            safe_print(f"[Worker {self.worker_id}] Nav error: {e}")
+            return False
 
-with urllib.request.urlopen("http://127.0.0.1:9222/json", timeout=5) as resp:
-    targets = json.load(resp)
+        # 404/501: the image predates /navigate (no POST handler)
+        if resp.status in (404, 501):
+            return self.navigate_via_exec(url)
+        if resp.status != 200:
+            safe_print(f"[Worker {self.worker_id}] Nav error: {json_loads(resp.data).get('error')}")
+            return False
+        return True
 
-for t in targets:
-    if t.get("type") == "page":
-        ws = websocket.create_connection(t["webSocketDebuggerUrl"], timeout=10)
-        ws.send(json.dumps({{"id": 1, "method": "Page.navigate", "params": {{"url": "{url}"}}}}))
-        ws.recv()
-        ws.close()
-        break
-'''
+    def navigate_via_exec(self, url: str) -> bool:
+        """Navigate Chromium to a URL via CDP (using the container's websocket)."""
         full_cmd = [
             self.runtime, "exec",
             "-u", "user",
             "-e", "XDG_RUNTIME_DIR=/tmp/xdg",
             "-e", "WAYLAND_DISPLAY=wayland-1",
             self.container_name,
-            "python3", "-c", nav_script
+            "python3", "-c", NAV_SCRIPT, url
         ]
         try:
             result = subprocess.run(full_cmd, capture_output=True, text=True, timeout=30)
             if result.returncode != 0:
                 safe_print(f"[Worker {self.worker_id}] Nav error: {result.stderr}")
-            return result.returncode == 0
+                return False
         except subprocess.TimeoutExpired:
             safe_print(f"[Worker {self.worker_id}] Navigation timeout")
             return False
+        time.sleep(3)  # No load event on this path; wait for page load
+        return True
 
     def send_click(self, x: int, y: int) -> bool:
         """Send click via desktopd tablet API."""
-        data = json.dumps({"events": [{"type": "click", "x": x, "y": y, "button": "left"}]}).encode()
-        req = urllib.request.Request(
-            f"{self.desktopd_url}/api/v1/tablet_event",
-            data=data,
-            headers={"Content-Type": "application/json"},
-            method="POST"
-        )
+        data = json_dumps({"events": [{"type": "click", "x": x, "y": y, "button": "left"}]})
         try:
-            with urllib.request.urlopen(req, timeout=5) as resp:
-                return resp.status == 204
+            resp = self.request("POST", f"{self.desktopd_url}/api/v1/tablet_event", 5,
+                                body=data, headers=_JSON_HEADERS)
+            return resp.status == 204
         except Exception as e:
             safe_print(f"[Worker {self.worker_id}] Click error: {e}")
             return False
 
     def send_keyboard(self, text: str) -> bool:
         """Send text input via desktopd keyboard API."""
-        events = []
-        for char in text:
-            events.append({"keysym": char, "state": "down"})
-            events.append({"keysym": char, "state": "up"})
-
-        data = json.dumps({"events": events}).encode()
-        req = urllib.request.Request(
-            f"{self.desktopd_url}/api/v1/keyboard_event",
-            data=data,
-            headers={"Content-Type": "application/json"},
-            method="POST"
-        )
+        # A down/up pair per character
+        events = [event for char in text
+                  for event in ({"keysym": char, "state": "down"}, {"keysym": char, "state": "up"})]
+
+        data = json_dumps({"events": events})
         try:
-            with urllib.request.urlopen(req, timeout=5) as resp:
-                return resp.status == 204
+            resp = self.request("POST", f"{self.desktopd_url}/api/v1/keyboard_event", 5,
+                                body=data, headers=_JSON_HEADERS)
+            return resp.status == 204
         except Exception as e:
             safe_print(f"[Worker {self.worker_id}] Keyboard error: {e}")
             return False
 
     def collect_step(self, output_dir: Path, step_index: int, action: dict) -> bool:
         """Collect one step: screenshot, ui_tree, action."""
-        step_dir = output_dir / "steps" / f"{step_index:03d}"
-        step_dir.mkdir(parents=True, exist_ok=True)
+        step_dir = output_dir / "steps" / f"{step_index:03d}"  # Created by collect_trajectory
 
         # Screenshot
-        screenshot_path = step_dir / "screenshot.png"
+        screenshot_path = step_dir / f"screenshot.{self.image_format}"
         if not self.get_screenshot(str(screenshot_path)):
             return False
 
         # UI tree
-        layout = self.get_cdp_layout()
-        ui_tree = convert_layout_to_ui_tree(layout)
+        ui_tree = self.layout_to_ui_tree(self.get_cdp_layout())
         ui_tree_path = step_dir / "ui_tree.json"
-        with open(ui_tree_path, "w") as f:
-            json.dump(ui_tree, f, indent=2)
+        if self.ui_tree_store is not None:
+            # Key on the tree itself: the capture timestamp differs every time,
+            # so a shared file keeps the timestamp of its first capture
+            key = json_dumps([ui_tree["screen"], ui_tree["root"]])
+            write_shared(ui_tree_path, encode_json(ui_tree, self.pretty), key, self.ui_tree_store)
+        else:
+            write_json(ui_tree_path, ui_tree, indent=self.pretty)
 
         # Action
         action["step_index"] = step_index
         action_path = step_dir / "action.json"
-        with open(action_path, "w") as f:
-            json.dump(action, f, indent=2)
+        write_json(action_path, action, indent=self.pretty)
 
         return True
 
@@ -202,16 +358,23 @@ for t in targets:
         """Collect a complete trajectory."""
         traj_id = task["task_id"]
         traj_dir = output_dir / "trajectories" / traj_id
-        traj_dir.mkdir(parents=True, exist_ok=True)
+        # Create the whole directory tree up front rather than per step
+        steps_root = traj_dir / "steps"
+        steps_root.mkdir(parents=True, exist_ok=True)
+        for i in range(len(actions)):
+            (steps_root / f"{i:03d}").mkdir(exist_ok=True)
 
         # Save task
         task_path = traj_dir / "task.json"
-        with open(task_path, "w") as f:
-            json.dump(task, f, indent=2)
+        write_json(task_path, task)
 
         # Collect steps
         start_time = time.time()
+        deadline = time.monotonic() + TRAJECTORY_BUDGET
         for i, action in enumerate(actions):
+            if time.monotonic() > deadline:
+                safe_print(f"[Worker {self.worker_id}] Trajectory over {TRAJECTORY_BUDGET}s budget at step {i}")
+                return False
             if not self.collect_step(traj_dir, i, action):
                 safe_print(f"[Worker {self.worker_id}] Failed to collect step {i}")
                 return False
@@ -224,11 +387,12 @@ for t in targets:
                 self.send_keyboard(action["parameters"]["text"])
             elif action["action_type"] == "wait":
                 time.sleep(action["parameters"].get("seconds", 1))
+                continue  # The wait itself lets the UI settle
 
             time.sleep(0.5)  # Wait for UI to update
 
         # Final screenshot
-        final_path = traj_dir / "final_screenshot.png"
+        final_path = traj_dir / f"final_screenshot.{self.image_format}"
         self.get_screenshot(str(final_path))
 
         # Result
@@ -242,143 +406,144 @@ for t in targets:
             "model_info": {"name": "human", "version": "1.0"}
         }
         result_path = traj_dir / "result.json"
-        with open(result_path, "w") as f:
-            json.dump(result, f, indent=2)
+        write_json(result_path, result)
+
+        # One filesystem flush per trajectory rather than an fsync per file
+        if self.durable:
+            syncfs(traj_dir)
 
         return True
 
 
-# 100 general website tasks for data collection
-SAMPLE_TASKS = [
+# 100 general website tasks for data collection: (task_id, url, instruction)
+SAMPLE_TASKS = (
     # News & Media
-    {"task_id": "bbc_news", "url": "https://www.bbc.com", "instruction": "Visit BBC News homepage"},
-    {"task_id": "cnn_news", "url": "https://www.cnn.com", "instruction": "Navigate to CNN homepage"},
-    {"task_id": "reuters", "url": "https://www.reuters.com", "instruction": "Open Reuters news site"},
-    {"task_id": "ap_news", "url": "https://apnews.com", "instruction": "Visit Associated Press news"},
-    {"task_id": "npr", "url": "https://www.npr.org", "instruction": "Open NPR homepage"},
-    {"task_id": "theguardian", "url": "https://www.theguardian.com", "instruction": "Visit The Guardian"},
-    {"task_id": "nytimes", "url": "https://www.nytimes.com", "instruction": "Navigate to NY Times"},
-    {"task_id": "washingtonpost", "url": "https://www.washingtonpost.com", "instruction": "Open Washington Post"},
-    {"task_id": "aljazeera", "url": "https://www.aljazeera.com", "instruction": "Visit Al Jazeera news"},
-    {"task_id": "bloomberg", "url": "https://www.bloomberg.com", "instruction": "Open Bloomberg homepage"},
+    ("bbc_news", "https://www.bbc.com", "Visit BBC News homepage"),
+    ("cnn_news", "https://www.cnn.com", "Navigate to CNN homepage"),
+    ("reuters", "https://www.reuters.com", "Open Reuters news site"),
+    ("ap_news", "https://apnews.com", "Visit Associated Press news"),
+    ("npr", "https://www.npr.org", "Open NPR homepage"),
+    ("theguardian", "https://www.theguardian.com", "Visit The Guardian"),
+    ("nytimes", "https://www.nytimes.com", "Navigate to NY Times"),
+    ("washingtonpost", "https://www.washingtonpost.com", "Open Washington Post"),
+    ("aljazeera", "https://www.aljazeera.com", "Visit Al Jazeera news"),
+    ("bloomberg", "https://www.bloomberg.com", "Open Bloomberg homepage"),
 
     # Search Engines
-    {"task_id": "google", "url": "https://www.google.com", "instruction": "Open Google search"},
-    {"task_id": "duckduckgo", "url": "https://duckduckgo.com", "instruction": "Visit DuckDuckGo search"},
-    {"task_id": "bing", "url": "https://www.bing.com", "instruction": "Navigate to Bing search"},
-    {"task_id": "yahoo", "url": "https://www.yahoo.com", "instruction": "Open Yahoo homepage"},
-    {"task_id": "ecosia", "url": "https://www.ecosia.org", "instruction": "Visit Ecosia search engine"},
-    {"task_id": "startpage", "url": "https://www.startpage.com", "instruction": "Open Startpage search"},
-    {"task_id": "brave_search", "url": "https://search.brave.com", "instruction": "Visit Brave Search"},
-    {"task_id": "qwant", "url": "https://www.qwant.com", "instruction": "Open Qwant search engine"},
+    ("google", "https://www.google.com", "Open Google search"),
+    ("duckduckgo", "https://duckduckgo.com", "Visit DuckDuckGo search"),
+    ("bing", "https://www.bing.com", "Navigate to Bing search"),
+    ("yahoo", "https://www.yahoo.com", "Open Yahoo homepage"),
+    ("ecosia", "https://www.ecosia.org", "Visit Ecosia search engine"),
+    ("startpage", "https://www.startpage.com", "Open Startpage search"),
+    ("brave_search", "https://search.brave.com", "Visit Brave Search"),
+    ("qwant", "https://www.qwant.com", "Open Qwant search engine"),
 
     # Reference & Knowledge
-    {"task_id": "wikipedia", "url": "https://www.wikipedia.org", "instruction": "Visit Wikipedia main page"},
-    {"task_id": "wiktionary", "url": "https://www.wiktionary.org", "instruction": "Open Wiktionary dictionary"},
-    {"task_id": "wikimedia", "url": "https://www.wikimedia.org", "instruction": "Visit Wikimedia Foundation"},
-    {"task_id": "britannica", "url": "https://www.britannica.com", "instruction": "Open Encyclopedia Britannica"},
-    {"task_id": "archive_org", "url": "https://archive.org", "instruction": "Visit Internet Archive"},
-    {"task_id": "wolfram", "url": "https://www.wolframalpha.com", "instruction": "Open Wolfram Alpha"},
+    ("wikipedia", "https://www.wikipedia.org", "Visit Wikipedia main page"),
+    ("wiktionary", "https://www.wiktionary.org", "Open Wiktionary dictionary"),
+    ("wikimedia", "https://www.wikimedia.org", "Visit Wikimedia Foundation"),
+    ("britannica", "https://www.britannica.com", "Open Encyclopedia Britannica"),
+    ("archive_org", "https://archive.org", "Visit Internet Archive"),
+    ("wolfram", "https://www.wolframalpha.com", "Open Wolfram Alpha"),
 
     # Tech & Developer
-    {"task_id": "github", "url": "https://github.com", "instruction": "Navigate to GitHub homepage"},
-    {"task_id": "gitlab", "url": "https://gitlab.com", "instruction": "Visit GitLab homepage"},
-    {"task_id": "stackoverflow", "url": "https://stackoverflow.com", "instruction": "Open Stack Overflow"},
-    {"task_id": "mdn", "url": "https://developer.mozilla.org", "instruction": "Visit MDN Web Docs"},
-    {"task_id": "python_docs", "url": "https://docs.python.org", "instruction": "Open Python documentation"},
-    {"task_id": "nodejs_docs", "url": "https://nodejs.org", "instruction": "Visit Node.js homepage"},
-    {"task_id": "rust_lang", "url": "https://www.rust-lang.org", "instruction": "Open Rust language site"},
-    {"task_id": "golang", "url": "https://go.dev", "instruction": "Visit Go programming language"},
-    {"task_id": "typescript", "url": "https://www.typescriptlang.org", "instruction": "Open TypeScript homepage"},
-    {"task_id": "reactjs", "url": "https://react.dev", "instruction": "Visit React documentation"},
-    {"task_id": "vuejs", "url": "https://vuejs.org", "instruction": "Open Vue.js homepage"},
-    {"task_id": "angular", "url": "https://angular.io", "instruction": "Visit Angular framework site"},
-    {"task_id": "nextjs", "url": "https://nextjs.org", "instruction": "Open Next.js documentation"},
-    {"task_id": "docker_hub", "url": "https://hub.docker.com", "instruction": "Visit Docker Hub"},
-    {"task_id": "kubernetes", "url": "https://kubernetes.io", "instruction": "Open Kubernetes documentation"},
-    {"task_id": "npmjs", "url": "https://www.npmjs.com", "instruction": "Visit npm registry"},
-    {"task_id": "pypi", "url": "https://pypi.org", "instruction": "Open PyPI package index"},
-    {"task_id": "crates_io", "url": "https://crates.io", "instruction": "Visit Rust crates registry"},
-    {"task_id": "rubygems", "url": "https://rubygems.org", "instruction": "Open RubyGems registry"},
-    {"task_id": "maven", "url": "https://mvnrepository.com", "instruction": "Visit Maven repository"},
-    {"task_id": "nuget", "url": "https://www.nuget.org", "instruction": "Open NuGet gallery"},
+    ("github", "https://github.com", "Navigate to GitHub homepage"),
+    ("gitlab", "https://gitlab.com", "Visit GitLab homepage"),
+    ("stackoverflow", "https://stackoverflow.com", "Open Stack Overflow"),
+    ("mdn", "https://developer.mozilla.org", "Visit MDN Web Docs"),
+    ("python_docs", "https://docs.python.org", "Open Python documentation"),
+    ("nodejs_docs", "https://nodejs.org", "Visit Node.js homepage"),
+    ("rust_lang", "https://www.rust-lang.org", "Open Rust language site"),
+    ("golang", "https://go.dev", "Visit Go programming language"),
+    ("typescript", "https://www.typescriptlang.org", "Open TypeScript homepage"),
+    ("reactjs", "https://react.dev", "Visit React documentation"),
+    ("vuejs", "https://vuejs.org", "Open Vue.js homepage"),
+    ("angular", "https://angular.io", "Visit Angular framework site"),
+    ("nextjs", "https://nextjs.org", "Open Next.js documentation"),
+    ("docker_hub", "https://hub.docker.com", "Visit Docker Hub"),
+    ("kubernetes", "https://kubernetes.io", "Open Kubernetes documentation"),
+    ("npmjs", "https://www.npmjs.com", "Visit npm registry"),
+    ("pypi", "https://pypi.org", "Open PyPI package index"),
+    ("crates_io", "https://crates.io", "Visit Rust crates registry"),
+    ("rubygems", "https://rubygems.org", "Open RubyGems registry"),
+    ("maven", "https://mvnrepository.com", "Visit Maven repository"),
+    ("nuget", "https://www.nuget.org", "Open NuGet gallery"),
 
     # Tech News & Community
-    {"task_id": "hackernews", "url": "https://news.ycombinator.com", "instruction": "Browse Hacker News"},
-    {"task_id": "reddit", "url": "https://www.reddit.com", "instruction": "Visit Reddit homepage"},
-    {"task_id": "slashdot", "url": "https://slashdot.org", "instruction": "Open Slashdot news"},
-    {"task_id": "techcrunch", "url": "https://techcrunch.com", "instruction": "Visit TechCrunch"},
-    {"task_id": "arstechnica", "url": "https://arstechnica.com", "instruction": "Open Ars Technica"},
-    {"task_id": "wired", "url": "https://www.wired.com", "instruction": "Visit Wired magazine"},
-    {"task_id": "theverge", "url": "https://www.theverge.com", "instruction": "Open The Verge"},
-    {"task_id": "engadget", "url": "https://www.engadget.com", "instruction": "Visit Engadget"},
-    {"task_id": "devto", "url": "https://dev.to", "instruction": "Open DEV Community"},
-    {"task_id": "hashnode", "url": "https://hashnode.com", "instruction": "Visit Hashnode blog platform"},
-    {"task_id": "medium", "url": "https://medium.com", "instruction": "Open Medium homepage"},
+    ("hackernews", "https://news.ycombinator.com", "Browse Hacker News"),
+    ("reddit", "https://www.reddit.com", "Visit Reddit homepage"),
+    ("slashdot", "https://slashdot.org", "Open Slashdot news"),
+    ("techcrunch", "https://techcrunch.com", "Visit TechCrunch"),
+    ("arstechnica", "https://arstechnica.com", "Open Ars Technica"),
+    ("wired", "https://www.wired.com", "Visit Wired magazine"),
+    ("theverge", "https://www.theverge.com", "Open The Verge"),
+    ("engadget", "https://www.engadget.com", "Visit Engadget"),
+    ("devto", "https://dev.to", "Open DEV Community"),
+    ("hashnode", "https://hashnode.com", "Visit Hashnode blog platform"),
+    ("medium", "https://medium.com", "Open Medium homepage"),
 
     # Education & Learning
-    {"task_id": "coursera", "url": "https://www.coursera.org", "instruction": "Visit Coursera platform"},
-    {"task_id": "edx", "url": "https://www.edx.org", "instruction": "Open edX learning platform"},
-    {"task_id": "khanacademy", "url": "https://www.khanacademy.org", "instruction": "Visit Khan Academy"},
-    {"task_id": "udemy", "url": "https://www.udemy.com", "instruction": "Open Udemy marketplace"},
-    {"task_id": "codecademy", "url": "https://www.codecademy.com", "instruction": "Visit Codecademy"},
-    {"task_id": "freecodecamp", "url": "https://www.freecodecamp.org", "instruction": "Open freeCodeCamp"},
-    {"task_id": "w3schools", "url": "https://www.w3schools.com", "instruction": "Visit W3Schools tutorials"},
-    {"task_id": "mit_ocw", "url": "https://ocw.mit.edu", "instruction": "Open MIT OpenCourseWare"},
-    {"task_id": "skillshare", "url": "https://www.skillshare.com", "instruction": "Visit Skillshare"},
+    ("coursera", "https://www.coursera.org", "Visit Coursera platform"),
+    ("edx", "https://www.edx.org", "Open edX learning platform"),
+    ("khanacademy", "https://www.khanacademy.org", "Visit Khan Academy"),
+    ("udemy", "https://www.udemy.com", "Open Udemy marketplace"),
+    ("codecademy", "https://www.codecademy.com", "Visit Codecademy"),
+    ("freecodecamp", "https://www.freecodecamp.org", "Open freeCodeCamp"),
+    ("w3schools", "https://www.w3schools.com", "Visit W3Schools tutorials"),
+    ("mit_ocw", "https://ocw.mit.edu", "Open MIT OpenCourseWare"),
+    ("skillshare", "https://www.skillshare.com", "Visit Skillshare"),
 
     # Productivity & Tools
-    {"task_id": "notion", "url": "https://www.notion.so", "instruction": "Open Notion homepage"},
-    {"task_id": "trello", "url": "https://trello.com", "instruction": "Visit Trello boards"},
-    {"task_id": "asana", "url": "https://asana.com", "instruction": "Open Asana project management"},
-    {"task_id": "slack", "url": "https://slack.com", "instruction": "Visit Slack homepage"},
-    {"task_id": "discord", "url": "https://discord.com", "instruction": "Open Discord platform"},
-    {"task_id": "zoom", "url": "https://zoom.us", "instruction": "Visit Zoom homepage"},
-    {"task_id": "dropbox", "url": "https://www.dropbox.com", "instruction": "Open Dropbox homepage"},
-    {"task_id": "evernote", "url": "https://evernote.com", "instruction": "Visit Evernote"},
-    {"task_id": "todoist", "url": "https://todoist.com", "instruction": "Open Todoist app"},
-    {"task_id": "calendly", "url": "https://calendly.com", "instruction": "Visit Calendly scheduling"},
+    ("notion", "https://www.notion.so", "Open Notion homepage"),
+    ("trello", "https://trello.com", "Visit Trello boards"),
+    ("asana", "https://asana.com", "Open Asana project management"),
+    ("slack", "https://slack.com", "Visit Slack homepage"),
+    ("discord", "https://discord.com", "Open Discord platform"),
+    ("zoom", "https://zoom.us", "Visit Zoom homepage"),
+    ("dropbox", "https://www.dropbox.com", "Open Dropbox homepage"),
+    ("evernote", "https://evernote.com", "Visit Evernote"),
+    ("todoist", "https://todoist.com", "Open Todoist app"),
+    ("calendly", "https://calendly.com", "Visit Calendly scheduling"),
 
     # APIs & Dev Tools
-    {"task_id": "httpbin", "url": "https://httpbin.org", "instruction": "Open httpbin.org for testing"},
-    {"task_id": "jsonplaceholder", "url": "https://jsonplaceholder.typicode.com", "instruction": "Visit JSONPlaceholder API"},
-    {"task_id": "reqres", "url": "https://reqres.in", "instruction": "Open ReqRes test API"},
-    {"task_id": "postman", "url": "https://www.postman.com", "instruction": "Visit Postman API platform"},
-    {"task_id": "swagger", "url": "https://swagger.io", "instruction": "Open Swagger API tools"},
-    {"task_id": "rapidapi", "url": "https://rapidapi.com", "instruction": "Visit RapidAPI hub"},
-    {"task_id": "apidoc", "url": "https://apidocjs.com", "instruction": "Open apiDoc documentation"},
+    ("httpbin", "https://httpbin.org", "Open httpbin.org for testing"),
+    ("jsonplaceholder", "https://jsonplaceholder.typicode.com", "Visit JSONPlaceholder API"),
+    ("reqres", "https://reqres.in", "Open ReqRes test API"),
+    ("postman", "https://www.postman.com", "Visit Postman API platform"),
+    ("swagger", "https://swagger.io", "Open Swagger API tools"),
+    ("rapidapi", "https://rapidapi.com", "Visit RapidAPI hub"),
+    ("apidoc", "https://apidocjs.com", "Open apiDoc documentation"),
 
     # Design & Creative
-    {"task_id": "figma", "url": "https://www.figma.com", "instruction": "Visit Figma design tool"},
-    {"task_id": "dribbble", "url": "https://dribbble.com", "instruction": "Open Dribbble design showcase"},
-    {"task_id": "behance", "url": "https://www.behance.net", "instruction": "Visit Behance portfolio"},
-    {"task_id": "canva", "url": "https://www.canva.com", "instruction": "Open Canva design platform"},
-    {"task_id": "unsplash", "url": "https://unsplash.com", "instruction": "Visit Unsplash photos"},
-    {"task_id": "pexels", "url": "https://www.pexels.com", "instruction": "Open Pexels stock photos"},
-    {"task_id": "fontawesome", "url": "https://fontawesome.com", "instruction": "Visit Font Awesome icons"},
-    {"task_id": "coolors", "url": "https://coolors.co", "instruction": "Open Coolors palette generator"},
+    ("figma", "https://www.figma.com", "Visit Figma design tool"),
+    ("dribbble", "https://dribbble.com", "Open Dribbble design showcase"),
+    ("behance", "https://www.behance.net", "Visit Behance portfolio"),
+    ("canva", "https://www.canva.com", "Open Canva design platform"),
+    ("unsplash", "https://unsplash.com", "Visit Unsplash photos"),
+    ("pexels", "https://www.pexels.com", "Open Pexels stock photos"),
+    ("fontawesome", "https://fontawesome.com", "Visit Font Awesome icons"),
+    ("coolors", "https://coolors.co", "Open Coolors palette generator"),
 
     # Example & Test Sites
-    {"task_id": "example_com", "url": "https://www.example.com", "instruction": "View example.com homepage"},
-    {"task_id": "example_org", "url": "https://www.example.org", "instruction": "Open example.org"},
-    {"task_id": "iana_domains", "url": "https://www.iana.org/domains/reserved", "instruction": "Visit IANA reserved domains"},
+    ("example_com", "https://www.example.com", "View example.com homepage"),
+    ("example_org", "https://www.example.org", "Open example.org"),
+    ("iana_domains", "https://www.iana.org/domains/reserved", "Visit IANA reserved domains"),
 
     # Utilities
-    {"task_id": "speedtest", "url": "https://www.speedtest.net", "instruction": "Open Speedtest by Ookla"},
-    {"task_id": "whatismyip", "url": "https://www.whatismyip.com", "instruction": "Check IP address"},
-    {"task_id": "timeanddate", "url": "https://www.timeanddate.com", "instruction": "Visit Time and Date"},
-    {"task_id": "weather_com", "url": "https://weather.com", "instruction": "Open Weather.com"},
-    {"task_id": "xe_currency", "url": "https://www.xe.com", "instruction": "Visit XE currency converter"},
-    {"task_id": "imdb", "url": "https://www.imdb.com", "instruction": "Visit IMDB movie database"},
-    {"task_id": "amazon", "url": "https://www.amazon.com", "instruction": "Open Amazon homepage"},
-]
-
-
-def process_task(worker: ContainerWorker, task_data: dict, output_dir: Path, task_num: int, total: int) -> bool:
-    """Process a single task with a worker."""
-    task_id = task_data["task_id"]
-    url = task_data["url"]
-    instruction = task_data["instruction"]
+    ("speedtest", "https://www.speedtest.net", "Open Speedtest by Ookla"),
+    ("whatismyip", "https://www.whatismyip.com", "Check IP address"),
+    ("timeanddate", "https://www.timeanddate.com", "Visit Time and Date"),
+    ("weather_com", "https://weather.com", "Open Weather.com"),
+    ("xe_currency", "https://www.xe.com", "Visit XE currency converter"),
+    ("imdb", "https://www.imdb.com", "Visit IMDB movie database"),
+    ("amazon", "https://www.amazon.com", "Open Amazon homepage"),
+)
+
+
+def process_task(worker: ContainerWorker, task_data: tuple, output_dir: Path, task_num: int, total: int) -> bool:
+    """Process a single (task_id, url, instruction) task with a worker."""
+    task_id, url, instruction = task_data
 
     task = {
         "task_id": task_id,
@@ -399,8 +564,6 @@ def process_task(worker: ContainerWorker, task_data: dict, output_dir: Path, tas
         safe_print(f"[Worker {worker.worker_id}] Failed to navigate to {url}")
         return False
 
-    time.sleep(3)  # Wait for page load
-
     # Collect trajectory
     if worker.collect_trajectory(output_dir, task, actions):
         safe_print(f"[Worker {worker.worker_id}] Success: {task_id}")
@@ -410,23 +573,73 @@ def process_task(worker: ContainerWorker, task_data: dict, output_dir: Path, tas
         return False
 
 
+def worker_loop(worker: ContainerWorker, tasks: queue.Queue, results: queue.Queue, output_dir: Path, total: int) -> None:
+    """Drain tasks on this worker's container, one at a time, until a None sentinel."""
+    while True:
+        item = tasks.get()
+        if item is None:
+            return
+        task_num, task_data = item
+        try:
+            success = process_task(worker, task_data, output_dir, task_num, total)
+        except Exception as e:
+            safe_print(f"Task {task_data[0]} raised exception: {e}")
+            success = False
+        results.put(success)
+
+
+def load_index_entry(traj_path: Path) -> Optional[dict]:
+    """Index entry for a trajectory directory, or None if it is incomplete."""
+    # Workers abandoned at a deadline may still be writing these files, so a
+    # missing, truncated (JSONDecodeError is a ValueError) or partial file
+    # just leaves the trajectory out of the index
+    try:
+        task = json_loads((traj_path / "task.json").read_bytes())
+        result = json_loads((traj_path / "result.json").read_bytes())
+        return {
+            "id": traj_path.name,
+            "task_id": task["task_id"],
+            "success": result["success"],
+            "steps": result["total_steps"],
+            "application": task.get("application")
+        }
+    except (FileNotFoundError, ValueError, KeyError):
+        return None
+
+
 def main():
     parser = argparse.ArgumentParser(description="Concurrent SFT data collection")
     parser.add_argument("--output", "-o", required=True, help="Output directory")
     parser.add_argument("--count", "-n", type=int, default=100, help="Number of samples to collect")
     parser.add_argument("--workers", "-w", type=int, default=5, help="Number of concurrent workers")
     parser.add_argument("--base-port", type=int, default=8080, help="Base port for containers")
+    parser.add_argument("--pretty", action="store_true", help="Indent per-step JSON files (for debugging)")
+    parser.add_argument("--durable", action="store_true", help="syncfs the output filesystem after each trajectory")
+    parser.add_argument("--image-format", choices=["png", "webp"], default="png",
+                        help="Screenshot format; webp is smaller but needs Pillow and is not the "
+                             "screenshot.png layout data_format validates")
+    parser.add_argument("--dedup-ui-trees", action="store_true",
+                        help="Store each distinct ui_tree once under ui_trees/ and hard-link step files "
+                             "to it; linked copies keep the first capture's timestamp")
     args = parser.parse_args()
 
     output_dir = Path(args.output)
     output_dir.mkdir(parents=True, exist_ok=True)
 
+    ui_tree_store = None
+    if args.dedup_ui_trees:
+        ui_tree_store = output_dir / "ui_trees"
+        ui_tree_store.mkdir(exist_ok=True)
+
     print(f"Collecting {args.count} samples to {output_dir}", file=sys.stderr)
     print(f"Using {args.workers} concurrent workers", file=sys.stderr)
-    print(f"Container runtime: {detect_runtime()}", file=sys.stderr)
+    runtime = detect_runtime()
+    print(f"Container runtime: {runtime}", file=sys.stderr)
 
     # Create workers
-    workers = [ContainerWorker(i, args.base_port) for i in range(args.workers)]
+    workers = [ContainerWorker(i, runtime, args.base_port, args.pretty, args.durable, args.image_format,
+                               ui_tree_store)
+               for i in range(args.workers)]
 
     # Check which workers are ready
     ready_workers = []
@@ -441,7 +654,7 @@ def main():
         print("No workers ready! Start containers first.", file=sys.stderr)
         print("\nTo start containers:", file=sys.stderr)
         print(f"  for i in {{0..{args.workers-1}}}; do", file=sys.stderr)
-        print(f"    {detect_runtime()} run -d --name osworld-$i \\", file=sys.stderr)
+        print(f"    {runtime} run -d --name osworld-$i \\", file=sys.stderr)
         print(f"      -p $((8080+i*10)):8080 -p $((8122+i*10)):8122 \\", file=sys.stderr)
         print("      localhost/osworld-desktopd:latest", file=sys.stderr)
         print("  done", file=sys.stderr)
@@ -456,29 +669,43 @@ def main():
     collected = 0
     failed = 0
 
-    # Process tasks concurrently
-    with ThreadPoolExecutor(max_workers=len(ready_workers)) as executor:
-        # Create a mapping of futures to task info
-        future_to_task = {}
-
-        for i, task_data in enumerate(tasks_to_process):
-            # Round-robin assignment to workers
-            worker = ready_workers[i % len(ready_workers)]
-            future = executor.submit(process_task, worker, task_data, output_dir, i + 1, total_tasks)
-            future_to_task[future] = task_data
-
-        # Collect results as they complete
-        for future in as_completed(future_to_task):
-            task_data = future_to_task[future]
-            try:
-                success = future.result()
-                if success:
-                    collected += 1
-                else:
-                    failed += 1
-            except Exception as e:
-                safe_print(f"Task {task_data['task_id']} raised exception: {e}")
+    # One thread per container, each pulling the next task when its container
+    # is free: a container never has two tasks in flight, and a slow site only
+    # holds up its own container
+    tasks = queue.Queue()
+    results = queue.Queue()
+    for i, task_data in enumerate(tasks_to_process):
+        tasks.put((i + 1, task_data))
+    for _ in ready_workers:
+        tasks.put(None)
+
+    threads = [Thread(target=worker_loop, args=(w, tasks, results, output_dir, total_tasks), daemon=True)
+               for w in ready_workers]
+    for t in threads:
+        t.start()
+
+    deadline = time.monotonic() + total_tasks * TASK_BUDGET
+    try:
+        for _ in range(total_tasks):
+            if results.get(timeout=max(deadline - time.monotonic(), 0)):
+                collected += 1
+            else:
                 failed += 1
+    except queue.Empty:
+        # Drop what has not started; threads stuck mid-task are daemons and
+        # are left behind, the rest exit on their sentinel
+        safe_print(f"Collection budget of {total_tasks * TASK_BUDGET}s exhausted, abandoning remaining tasks")
+        while True:
+            try:
+                tasks.get_nowait()
+            except queue.Empty:
+                break
+        for _ in ready_workers:
+            tasks.put(None)
+        failed = total_tasks - collected
+    else:
+        for t in threads:
+            t.join()
 
     print(f"\n{'='*50}", file=sys.stderr)
     print(f"Collection complete: {collected} success, {failed} failed", file=sys.stderr)
@@ -496,25 +723,19 @@ def main():
 
     traj_dir = output_dir / "trajectories"
     if traj_dir.exists():
-        for traj_path in sorted(traj_dir.iterdir()):
-            task_file = traj_path / "task.json"
-            result_file = traj_path / "result.json"
-            if task_file.exists() and result_file.exists():
-                with open(task_file) as f:
-                    task = json.load(f)
-                with open(result_file) as f:
-                    result = json.load(f)
-                index["trajectories"].append({
-                    "id": traj_path.name,
-                    "task_id": task["task_id"],
-                    "success": result["success"],
-                    "steps": result["total_steps"],
-                    "application": task.get("application")
-                })
+        # Reads are independent small files; overlap them across threads
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            for entry in executor.map(load_index_entry, sorted(traj_dir.iterdir())):
+                if entry is not None:
+                    index["trajectories"].append(entry)
 
+    # Write beside and rename over, so a crash never leaves a truncated index
     index_path = output_dir / "index.json"
-    with open(index_path, "w") as f:
-        json.dump(index, f, indent=2)
+    tmp_path = index_path.with_suffix(".json.tmp")
+    write_json(tmp_path, index)
+    if args.durable:
+        syncfs(output_dir)
+    os.replace(tmp_path, index_path)
 
     print(f"Index written to {index_path}", file=sys.stderr)
     return 0 if collected > 0 else 1
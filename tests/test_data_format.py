@@ -1,3 +1,4 @@
+import importlib.util
 import tempfile
 import unittest
 from pathlib import Path
@@ -6,19 +7,30 @@ from data_format import (
     Action,
     Result,
     Step,
+    StepsBatch,
     Task,
     Trajectory,
     iter_sft_samples,
     load_trajectory,
     save_trajectory,
+    save_trajectory_parquet,
     validate_trajectory_dir,
 )
 
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+
+EXAMPLE_TRAJECTORY_DIR = Path("data_format/examples/traj_chrome_001")
+
 
 class TestDataFormat(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        # Parsed once for the class; tests only read it
+        cls.example = load_trajectory(EXAMPLE_TRAJECTORY_DIR)
+
     def test_load_trajectory_example(self) -> None:
-        trajectory_dir = Path("data_format/examples/traj_chrome_001")
-        trajectory = load_trajectory(trajectory_dir)
+        trajectory = self.example
 
         self.assertEqual(trajectory.trajectory_id, "traj_chrome_001")
         self.assertEqual(trajectory.task.task_id, "chrome_open_google")
@@ -55,8 +67,7 @@ class TestDataFormat(unittest.TestCase):
         self.assertEqual(samples[1]["input"]["history"][0]["action_type"], "click")
 
     def test_validate_trajectory_dir_warnings(self) -> None:
-        trajectory_dir = Path("data_format/examples/traj_chrome_001")
-        issues = validate_trajectory_dir(trajectory_dir)
+        issues = validate_trajectory_dir(EXAMPLE_TRAJECTORY_DIR)
 
         self.assertTrue(any(issue.severity == "warning" for issue in issues))
         self.assertFalse(any(issue.severity == "error" for issue in issues))
@@ -83,6 +94,63 @@ class TestDataFormat(unittest.TestCase):
         self.assertIsNotNone(reloaded.result)
         self.assertTrue(reloaded.result.success)
 
+    def test_save_and_reload_non_str_keys(self) -> None:
+        task = Task(task_id="t4", instruction="Pick option")
+        steps = [
+            Step(
+                index=0,
+                ui_tree={"root": {"id": "node_0"}},
+                action=Action(step_index=0, action_type="click", parameters={1: "a", "big": 2**70}),
+            )
+        ]
+        trajectory = Trajectory(trajectory_id="traj_keys", task=task, steps=steps)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            target_dir = Path(tmp_dir) / "traj_keys"
+            save_trajectory(trajectory, target_dir)
+            reloaded = load_trajectory(target_dir)
+
+        # Same as stdlib json: non-str keys come back as strings
+        self.assertEqual(reloaded.steps[0].action.parameters, {"1": "a", "big": 2**70})
+
+    @unittest.skipUnless(HAS_PYARROW, "pyarrow not installed")
+    def test_save_and_reload_parquet(self) -> None:
+        task = Task(task_id="t3", instruction="Open app")
+        steps = [
+            Step(
+                index=0,
+                ui_tree={"root": {"id": "node_0"}},
+                action=Action(step_index=0, action_type="click", parameters={"x": 1, "y": 2}),
+                screenshot_path="steps/000/screenshot.png",
+            ),
+            Step(
+                index=1,
+                ui_tree={"root": {"id": "node_1"}},
+                action=Action(step_index=1, action_type="wait", parameters={"seconds": 1}, reasoning="settle"),
+            ),
+        ]
+        result = Result(trajectory_id="traj_pq", success=True, total_steps=2)
+        trajectory = Trajectory(trajectory_id="traj_pq", task=task, steps=steps, result=result)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            target_dir = Path(tmp_dir) / "traj_pq"
+            save_trajectory_parquet(trajectory, target_dir)
+            self.assertFalse((target_dir / "steps").exists())
+            reloaded = load_trajectory(target_dir)
+
+        self.assertEqual(reloaded.steps, steps)
+        self.assertEqual(reloaded.result, result)
+
+    @unittest.skipUnless(HAS_PYARROW, "pyarrow not installed")
+    def test_steps_batch_round_trip(self) -> None:
+        steps = self.example.steps
+        batch = StepsBatch.from_steps(steps)
+
+        self.assertEqual(len(batch), len(steps))
+        self.assertEqual(batch.index.to_pylist(), [step.index for step in steps])
+        self.assertEqual(batch.to_steps(), steps)
+        self.assertEqual(StepsBatch.from_table(batch.to_table()).to_steps(), steps)
+
 
 if __name__ == "__main__":
     unittest.main()
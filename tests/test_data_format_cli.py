@@ -1,12 +1,27 @@
+import io
 import subprocess
 import sys
 import tempfile
 import unittest
+from contextlib import redirect_stdout
 from pathlib import Path
+from typing import List, Tuple
+
+from data_format.cli import main
+
+
+def run_cli(argv: List[str]) -> Tuple[int, str]:
+    """Run the CLI in-process, returning (exit code, stdout)."""
+    buf = io.StringIO()
+    with redirect_stdout(buf):
+        returncode = main(argv)
+    return returncode, buf.getvalue()
 
 
 class TestDataFormatCLI(unittest.TestCase):
     def test_validate_trajectory_cli(self) -> None:
+        # Smoke-test the real `python -m data_format` entry point once;
+        # the other cases call main() in-process
         command = [
             sys.executable,
             "-m",
@@ -20,17 +35,18 @@ class TestDataFormatCLI(unittest.TestCase):
         self.assertIn("warning:", result.stdout)
 
     def test_validate_trajectory_cli_missing_path(self) -> None:
-        command = [
-            sys.executable,
-            "-m",
-            "data_format",
-            "validate-trajectory",
-            "data_format/examples/does_not_exist",
-        ]
-        result = subprocess.run(command, capture_output=True, text=True, check=False)
+        returncode, stdout = run_cli(["validate-trajectory", "data_format/examples/does_not_exist"])
 
-        self.assertEqual(result.returncode, 2)
-        self.assertIn("path does not exist", result.stdout)
+        self.assertEqual(returncode, 2)
+        self.assertIn("path does not exist", stdout)
+
+    def test_validate_trajectory_cli_file_path(self) -> None:
+        with tempfile.NamedTemporaryFile() as tmp_file:
+            returncode, stdout = run_cli(["validate-trajectory", tmp_file.name])
+
+        self.assertEqual(returncode, 1)
+        self.assertIn("Missing task.json", stdout)
+        self.assertIn("Missing steps directory", stdout)
 
     def test_validate_dataset_cli(self) -> None:
         with tempfile.TemporaryDirectory() as tmp_dir:
@@ -46,18 +62,11 @@ class TestDataFormatCLI(unittest.TestCase):
                 encoding="utf-8",
             )
 
-            command = [
-                sys.executable,
-                "-m",
-                "data_format",
-                "validate-dataset",
-                str(dataset_root),
-            ]
-            result = subprocess.run(command, capture_output=True, text=True, check=False)
+            returncode, stdout = run_cli(["validate-dataset", str(dataset_root)])
 
-        self.assertEqual(result.returncode, 1)
-        self.assertIn("warning:", result.stdout)
-        self.assertIn("error:", result.stdout)
+        self.assertEqual(returncode, 1)
+        self.assertIn("warning:", stdout)
+        self.assertIn("error:", stdout)
 
 
 if __name__ == "__main__":
@@ -1,6 +1,12 @@
 import os
+import io
+import argparse
 import mimetypes
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import lru_cache
 import alibabacloud_oss_v2 as oss
+from alibabacloud_oss_v2.transport import RequestsHttpClient
 from tqdm import tqdm
 
 # ================= 配置区域 =================
@@ -15,9 +21,146 @@ LOCAL_DATASET_ROOT = '/Users/zhangxiuhui/Desktop/project/vlm-grounding/GUI_Groun
 # OSS 上的目标前缀 (也就是文件夹名)
 # 例如设置为 'benchmark_v1/'，那么文件就会传到 gui-test-zxh-0129/benchmark_v1/ 下
 OSS_TARGET_PREFIX = 'gui_grounding_benchmark_v1/' 
+
+# 并发上传线程数 (可用环境变量 OSS_UPLOAD_WORKERS 覆盖)
+MAX_WORKERS = int(os.environ.get('OSS_UPLOAD_WORKERS', 16))
+
+# 超过该大小的文件走分片上传 (分片并发上传，失败的分片单独重试，出错时自动清理已传分片)
+MULTIPART_THRESHOLD = 100 * 1024 * 1024
+PART_SIZE = 64 * 1024 * 1024
+PART_WORKERS = 4  # 单个文件的分片并发数
+
+# 同时排队/上传中的文件数上限: 边遍历边提交，内存只占这么多个任务
+MAX_IN_FLIGHT = MAX_WORKERS * 4
+
+# 遇到 5xx / 408 / 429 / 网络错误时自动重试 (带随机抖动的指数退避)，
+# 单个请求最多尝试 RETRY_MAX_ATTEMPTS 次，每次等待 [0, min(0.5 * 2^n, 30)) 秒
+RETRY_MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_BACKOFF = 30
+
+# --compress: 所有 PNG 截图先重新编码成 WebP 再上传 (Key 后缀统一改为 .webp，
+# 评测脚本需把 OSS_WEBP 设为 True 才能找到这些图片)
+WEBP_QUALITY = 90
 # ===========================================
 
-def main():
+# 在主线程里提前加载 MIME 数据库，避免上传线程里并发地懒加载
+mimetypes.init()
+
+@lru_cache(maxsize=None)
+def _content_type(ext):
+    """按扩展名 (小写，含点) 猜测 Content-Type，结果缓存，同一扩展名只查一次"""
+    content_type, _ = mimetypes.guess_type('x' + ext)
+    return content_type or 'application/octet-stream' # 默认二进制流
+
+class _CountingBackoff(oss.retry.FullJitterBackoff):
+    """SDK 自带的抖动指数退避，额外统计重试次数 (每次重试前调用一次 backoff_delay)"""
+
+    def __init__(self, base_delay, max_backoff):
+        super().__init__(base_delay, max_backoff)
+        self._lock = threading.Lock()
+        self.retries = 0
+
+    def backoff_delay(self, attempt, error):
+        with self._lock:
+            self.retries += 1
+        return super().backoff_delay(attempt, error)
+
+def _encode_webp(local_path):
+    """把 PNG 重新编码成 WebP，返回字节串 (在上传线程里执行，Pillow 编码时会释放 GIL)"""
+    from PIL import Image
+
+    with Image.open(local_path) as im:
+        if im.mode not in ('RGB', 'RGBA'):
+            im = im.convert('RGBA')
+        buf = io.BytesIO()
+        im.save(buf, 'WEBP', quality=WEBP_QUALITY, method=6)
+    return buf.getvalue()
+
+def _walk_files(root):
+    """
+    递归列出 root 下所有文件路径 (跳过隐藏文件，如 .DS_Store)。
+    用 os.scandir 手动维护目录栈: DirEntry 自带文件类型，不必像 os.walk 那样逐个 stat。
+    """
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file() and not entry.name.startswith('.'):
+                    yield entry.path
+
+def _iter_files(root, prefix):
+    """
+    惰性地生成 (本地路径, OSS Key)，不在内存里攒完整的文件列表。
+    例如: LOCAL_ROOT/images/01.png -> benchmark_v1/images/01.png
+    """
+    # 循环外只算一次: 本地根目录统一以分隔符结尾
+    root_len = len(os.path.join(root, ''))
+    windows = os.sep != '/'
+
+    for local_path in _walk_files(root):
+        # 遍历出的路径都以根目录开头，直接切片，不必每个文件调用 os.path.relpath
+        relative_path = local_path[root_len:]
+
+        # 注意：Windows下路径分隔符需要替换为 '/'
+        if windows:
+            relative_path = relative_path.replace(os.sep, '/')
+        yield local_path, prefix + relative_path
+
+def _list_remote_sizes(client):
+    """
+    列出 OSS_TARGET_PREFIX 下已有的对象，返回 {key: size}。
+    一次 LIST 最多返回 1000 个对象，比逐个文件 HEAD 便宜得多。
+    """
+    sizes = {}
+    paginator = client.list_objects_v2_paginator()
+    for page in paginator.iter_page(oss.ListObjectsV2Request(bucket=BUCKET_NAME, prefix=OSS_TARGET_PREFIX)):
+        for obj in page.contents or []:
+            sizes[obj.key] = obj.size
+    return sizes
+
+def _upload_one(client, uploader, local_path, oss_key, size, compress=False):
+    """
+    上传单个文件，在线程池中执行。
+    compress=True 时先把 PNG 编码成 WebP，上传编码后的字节。
+    返回 (oss_key, 错误信息)，成功时错误信息为 None。
+    """
+    try:
+        # 自动猜测 Content-Type (MIME类型)
+        if compress:
+            content_type = 'image/webp'
+        else:
+            content_type = _content_type(os.path.splitext(local_path)[1].lower())
+
+        # 构造上传请求
+        # 小文件使用 put_object_from_file 接口，大文件交给分片上传器
+        request = oss.PutObjectRequest(
+            bucket=BUCKET_NAME,
+            key=oss_key,
+            acl='public-read', # 设置为公共读，方便后续评测代码直接通过 URL 访问图片
+            headers={
+                'Content-Type': content_type
+            }
+        )
+
+        if compress:
+            request.body = _encode_webp(local_path)
+            result = client.put_object(request)
+        elif size > MULTIPART_THRESHOLD:
+            result = uploader.upload_file(request, filepath=local_path)
+        else:
+            result = client.put_object_from_file(request, local_path)
+
+        if result.status_code == 200:
+            return oss_key, None
+        return oss_key, f"上传失败 [{oss_key}]: Status {result.status_code}"
+
+    except Exception as e:
+        return oss_key, f"异常错误 [{oss_key}]: {e}"
+
+def main(force=False, compress=False):
     # 1. 初始化 OSS 客户端
     # 确保你的环境变量 OSS_ACCESS_KEY_ID 和 OSS_ACCESS_KEY_SECRET 已设置
     credentials_provider = oss.credentials.EnvironmentVariableCredentialsProvider()
@@ -25,84 +168,108 @@ def main():
     cfg.credentials_provider = credentials_provider
     cfg.region = REGION
     cfg.endpoint = ENDPOINT
+    # 所有上传线程共用一个连接池 (keep-alive，避免每个文件重新握手 TLS)。
+    # 池大小按最大并发请求数设置: 每个线程最多同时传 PART_WORKERS 个分片，
+    # 否则默认的 20 个连接不够用，多出来的连接会被用完即关
+    cfg.http_client = RequestsHttpClient(
+        max_connections=MAX_WORKERS * PART_WORKERS,
+        connect_timeout=10,
+        readwrite_timeout=60,
+    )
+    # 重试交给 SDK 的 retryer: 小文件和每个分片都按同一策略重试，
+    # 重试时 SDK 会把文件流 seek 回起点，不必整个重新遍历数据集
+    backoff = _CountingBackoff(RETRY_BASE_DELAY, RETRY_MAX_BACKOFF)
+    cfg.retryer = oss.retry.StandardRetryer(
+        max_attempts=RETRY_MAX_ATTEMPTS,
+        backoff_delayer=backoff,
+    )
     client = oss.Client(cfg)
+    # 分片上传器: 未设置 leave_parts_on_error，失败时会 abort 掉已上传的分片
+    uploader = client.uploader(part_size=PART_SIZE, parallel_num=PART_WORKERS)
 
     print(f"🚀 开始准备上传...")
     print(f"   本地目录: {LOCAL_DATASET_ROOT}")
     print(f"   OSS 目标: oss://{BUCKET_NAME}/{OSS_TARGET_PREFIX}")
 
-    # 2. 收集所有需要上传的文件
-    files_to_upload = []
     if not os.path.exists(LOCAL_DATASET_ROOT):
         print(f"❌ 错误: 本地路径不存在 -> {LOCAL_DATASET_ROOT}")
         return
 
-    for root, dirs, files in os.walk(LOCAL_DATASET_ROOT):
-        for file in files:
-            # 过滤掉系统隐藏文件 (如 .DS_Store)
-            if file.startswith('.'):
-                continue
-                
-            local_path = os.path.join(root, file)
-            
-            # 计算 OSS 上的 Key (保持相对目录结构)
-            # 例如: LOCAL_ROOT/images/01.png -> images/01.png
-            relative_path = os.path.relpath(local_path, LOCAL_DATASET_ROOT)
-            
-            # 拼接 OSS 前缀: benchmark_v1/images/01.png
-            # 注意：Windows下路径分隔符可能需要替换为 '/'
-            oss_key = os.path.join(OSS_TARGET_PREFIX, relative_path).replace("\\", "/")
-            
-            files_to_upload.append((local_path, oss_key))
-
-    print(f"📦 共发现 {len(files_to_upload)} 个文件，开始上传...\n")
-
-    # 3. 批量上传
+    # 前缀统一以 '/' 结尾 (为空则不加)
+    prefix = OSS_TARGET_PREFIX.rstrip('/') + '/' if OSS_TARGET_PREFIX else ''
+
+    # 2. 断点续传: 先列出 OSS 上已有的对象，跳过大小一致的文件 (force=True 时全部重传)
+    remote_sizes = {} if force else _list_remote_sizes(client)
+
+    # 3. 边遍历边上传: 文件不先收集成列表，遍历到一个就提交一个，
+    #    在途任务达到 MAX_IN_FLIGHT 时先等一批完成，内存占用与文件总数无关
+    found_count = 0
     success_count = 0
     fail_count = 0
+    skipped_count = 0
+    example_key = None
+    in_flight = set()
 
-    # 使用 tqdm 显示进度条
-    for local_path, oss_key in tqdm(files_to_upload, desc="Uploading", unit="file"):
-        try:
-            # 自动猜测 Content-Type (MIME类型)
-            content_type, _ = mimetypes.guess_type(local_path)
-            if content_type is None:
-                content_type = 'application/octet-stream' # 默认二进制流
-
-            # 构造上传请求
-            # 使用 put_object_from_file 接口
-            request = oss.PutObjectRequest(
-                bucket=BUCKET_NAME,
-                key=oss_key,
-                acl='public-read', # 设置为公共读，方便后续评测代码直接通过 URL 访问图片
-                headers={
-                    'Content-Type': content_type
-                }
-            )
+    # 上传是纯 I/O，用线程池并发发起请求 (oss.Client 线程安全，所有线程共用)
+    # 进度条只在主线程里更新；总数事先未知，只显示已完成数和速率。
+    # 没有总数就没法按比例设 miniters，改为按时间节流: 最多每 0.5 秒重绘一次
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex, \
+            tqdm(desc="Uploading", unit="file", mininterval=0.5, smoothing=0.1) as pbar:
 
-            result = client.put_object_from_file(request, local_path)
-            
-            if result.status_code == 200:
-                success_count += 1
+        def collect(futures):
+            nonlocal success_count, fail_count
+            for future in futures:
+                oss_key, error = future.result()
+                if error is None:
+                    success_count += 1
+                else:
+                    pbar.write(f"❌ {error}")
+                    fail_count += 1
+            pbar.update(len(futures))
+
+        for local_path, oss_key in _iter_files(LOCAL_DATASET_ROOT, prefix):
+            found_count += 1
+            size = os.path.getsize(local_path)
+            # 不按大小区分: 否则桶里 .png / .webp 混杂，评测脚本无法推断 URL
+            compress_one = compress and oss_key[-4:].lower() == '.png'
+            if compress_one:
+                # 压缩后的大小要编码了才知道，远端已有同名 .webp 就视为已上传
+                oss_key = oss_key[:-4] + '.webp'
+                skip = oss_key in remote_sizes
             else:
-                print(f"\n❌ 上传失败 [{oss_key}]: Status {result.status_code}")
-                fail_count += 1
+                skip = remote_sizes.get(oss_key) == size
+            if example_key is None:
+                example_key = oss_key
+            if skip:
+                skipped_count += 1
+                continue
+
+            if len(in_flight) >= MAX_IN_FLIGHT:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+            in_flight.add(ex.submit(_upload_one, client, uploader, local_path, oss_key,
+                                    size, compress_one))
 
-        except Exception as e:
-            print(f"\n❌ 异常错误 [{oss_key}]: {e}")
-            fail_count += 1
+        collect(wait(in_flight).done)
 
     # 4. 总结
     print("\n" + "="*40)
-    print(f"✅ 上传完成!")
+    print(f"✅ 上传完成! 共发现 {found_count} 个文件")
     print(f"   成功: {success_count}")
     print(f"   失败: {fail_count}")
+    print(f"   跳过: {skipped_count}")
+    print(f"   重试: {backoff.retries} 次")
     
     # 打印一个示例 URL 供你验证
-    if len(files_to_upload) > 0:
-        example_key = files_to_upload[0][1]
+    if example_key is not None:
         print(f"   示例文件链接: https://{BUCKET_NAME}.{ENDPOINT}/{example_key}")
     print("="*40)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="上传本地数据集到阿里云 OSS")
+    parser.add_argument("--force", action="store_true", help="重新上传所有文件，不跳过 OSS 上已存在的对象")
+    parser.add_argument("--compress", action="store_true",
+                        help="所有 PNG 先转成 WebP (quality=90) 再上传，OSS 上的后缀改为 .webp；需要 Pillow。"
+                             "eval_model*.py 需设置 OSS_WEBP = True 才能读取压缩后的数据集")
+    args = parser.parse_args()
+    main(force=args.force, compress=args.compress)